@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+
+def serialize_json(data: Any) -> bytes:
+    """
+    Сериализует ответ так же, как JSONResponse в FastAPI.
+
+    Args:
+        data: Модели pydantic, словари, списки
+
+    Returns:
+        JSON в UTF-8
+    """
+    return json.dumps(
+        jsonable_encoder(data),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class CachedResponse(NamedTuple):
+    """Сериализованный ответ, его строгий ETag, дополнительные заголовки и признак пустого результата."""
+    body: bytes
+    etag: str
+    headers: Optional[Dict[str, str]] = None
+    empty: bool = False
+
+    @classmethod
+    def from_body(cls, body: bytes, headers: Optional[Dict[str, str]] = None, empty: bool = False) -> "CachedResponse":
+        # ETag - хеш содержимого: совпадает только для байт-в-байт одинаковых ответов,
+        # в том числе между разными процессами и после перезапуска
+        return cls(body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', headers, empty)
+
+
+class CatalogCache:
+    """
+    Кеш готовых (сериализованных) ответов каталога.
+
+    Каталог меняется только при записи администратором, поэтому записи
+    кеша не устаревают по времени запроса, а сбрасываются счетчиком
+    поколений: каждая запись помнит поколение, в котором построена, и
+    invalidate() делает все старые записи недействительными. ttl - страховка
+    для изменений, о которых процесс не знает (другие воркеры uvicorn,
+    скрипты миграции). Объем ограничен max_bytes с вытеснением LRU.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        """
+        Args:
+            max_bytes: Максимальный суммарный размер ответов в байтах
+            ttl: Время жизни записи в секундах
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation = 0
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, CachedResponse]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        """
+        Возвращает ответ для ключа, если он построен в текущем поколении.
+
+        Args:
+            key: Нормализованный ключ запроса
+
+        Returns:
+            Ответ или None при промахе
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            generation, created_at, response = entry
+            if generation == self.generation and time.monotonic() - created_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return response
+            self._remove(key)
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        key: Hashable,
+        body: bytes,
+        generation: Optional[int] = None,
+        headers: Optional[Dict[str, str]] = None,
+        empty: bool = False
+    ) -> CachedResponse:
+        """
+        Сохраняет ответ и вытесняет самые старые записи при превышении лимита.
+
+        Args:
+            key: Нормализованный ключ запроса
+            body: Байты ответа
+            generation: Поколение, в котором начали строить ответ (по умолчанию текущее).
+                Если каталог успел измениться, пока шел запрос к базе, ответ не кешируется
+            headers: Заголовки, которые отдаются вместе с ответом (и из кеша тоже)
+            empty: Запрос ничего не нашел - по этому признаку обходятся без повторного запроса к базе
+
+        Returns:
+            Ответ с вычисленным ETag (даже если он не попал в кеш)
+        """
+        response = CachedResponse.from_body(body, headers, empty)
+        if generation is not None and generation != self.generation:
+            return response
+        if len(body) > self.max_bytes:
+            return response
+        self._remove(key)
+        self._entries[key] = (self.generation, time.monotonic(), response)
+        self.total_bytes += len(body)
+        while self.total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+        return response
+
+    def invalidate(self) -> None:
+        """Сбрасывает все записи после изменения каталога."""
+        self.generation += 1
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= len(entry[2].body)
+
+    @classmethod
+    def from_env(cls) -> "CatalogCache":
+        """Создает кеш по переменным окружения CATALOG_CACHE_MAX_MB и CATALOG_CACHE_TTL."""
+        return cls(
+            max_bytes=int(os.environ.get("CATALOG_CACHE_MAX_MB", 64)) * 1024 * 1024,
+            ttl=float(os.environ.get("CATALOG_CACHE_TTL", 60))
+        )
@@ -0,0 +1,337 @@
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pagination import RELEVANCE_SORT, SORT_FIELDS, decode_cursor, encode_cursor, get_sort_spec
+
+
+# Поля документа, которые нужны для фильтров, сортировки и курсоров
+ENGINE_FIELDS = ("id", "category", "price", "name", "created_at")
+
+# Поля, по которым хранятся отсортированные перестановки строк
+SORTED_FIELDS = ("id", "price", "name", "created_at")
+
+# Начальная емкость столбцов; дальше она удваивается
+INITIAL_CAPACITY = 1024
+
+
+class CatalogEngine:
+    """
+    Снимок активных товаров в памяти для запросов каталога без MongoDB.
+
+    Фильтры работают по столбцам NumPy: цена, код категории (строка -> целый
+    код) и признак живой строки. Для каждого поля сортировки хранится
+    перестановка строк по возрастанию (поле, id); убывающие режимы - та же
+    перестановка в обратном порядке, а позиция курсора находится бинарным
+    поиском. Запрос - это маска фильтров, выборка из перестановки и срез по limit.
+
+    Источник истины - MongoDB: снимок целиком загружается при старте (см.
+    from_documents, его можно строить вне цикла событий), а после записи
+    сервер перечитывает измененный товар и вызывает upsert или remove.
+    Изменение затрагивает только свою строку: значения пишутся в столбцы,
+    а строка переставляется в перестановках через bisect и np.insert/np.delete.
+
+    Порядок результатов совпадает с MongoDB: сортировка по (поле, id) с
+    одним направлением, строки сравниваются по кодовым точкам (как байты
+    UTF-8 в MongoDB), без сортировки - в порядке вставки. Результаты поиска
+    (matches) без sort_by упорядочены по релевантности.
+    """
+
+    def __init__(self):
+        self._docs: List[Optional[Dict[str, Any]]] = []
+        self._cards: List[Any] = []
+        self._rows: Dict[str, int] = {}
+        self._category_codes: Dict[str, int] = {}
+        self._price = np.empty(INITIAL_CAPACITY, dtype=np.float64)
+        self._category = np.empty(INITIAL_CAPACITY, dtype=np.int32)
+        self._alive = np.zeros(INITIAL_CAPACITY, dtype=bool)
+        self._ids = np.empty(INITIAL_CAPACITY, dtype="U36")
+        # Число живых строк без значения поля: MongoDB сортирует null первым - такие запросы не обслуживаем
+        self._missing = {field: 0 for field in ENGINE_FIELDS}
+        self._permutations: Dict[str, np.ndarray] = {}
+        self._sorted_ids: Optional[np.ndarray] = None
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @classmethod
+    def from_documents(cls, docs: List[Dict[str, Any]], cards: List[Any]) -> "CatalogEngine":
+        """
+        Строит снимок целиком.
+
+        Args:
+            docs: Документы активных товаров (нужны поля ENGINE_FIELDS)
+            cards: Готовые карточки товаров в том же порядке
+
+        Returns:
+            Загруженный снимок
+        """
+        engine = cls()
+        engine.replace_all(docs, cards)
+        return engine
+
+    def replace_all(self, docs: List[Dict[str, Any]], cards: List[Any]) -> None:
+        """
+        Заменяет снимок целиком.
+
+        Args:
+            docs: Документы активных товаров (нужны поля ENGINE_FIELDS)
+            cards: Готовые карточки товаров в том же порядке
+        """
+        self.__init__()
+        self._reserve(len(docs))
+        for doc, card in zip(docs, cards):
+            self._write_row(len(self._docs), doc, card)
+        for field in SORTED_FIELDS:
+            self._permutation(field)
+        self.loaded = True
+
+    def upsert(self, doc: Dict[str, Any], card: Any) -> None:
+        """Добавляет или обновляет активный товар (строка остается на месте, как запись в MongoDB)."""
+        row = self._rows.get(doc["id"])
+        if row is None:
+            row = len(self._docs)
+            self._reserve(row + 1)
+        else:
+            self._unlink(row)
+        self._write_row(row, doc, card)
+        self._link(row)
+
+    def remove(self, product_id: str) -> None:
+        """Убирает товар из снимка (удален или больше не активен)."""
+        row = self._rows.pop(product_id, None)
+        if row is None:
+            return
+        self._unlink(row)
+        self._alive[row] = False
+        self._docs[row] = None
+        self._cards[row] = None
+        # Сжимаем, когда удаленных строк стало больше половины
+        if len(self._rows) * 2 < len(self._docs):
+            self._compact()
+
+    def _reserve(self, size: int) -> None:
+        capacity = len(self._alive)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("_price", "_category", "_alive", "_ids"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def _write_row(self, row: int, doc: Dict[str, Any], card: Any) -> None:
+        fields = {field: doc.get(field) for field in ENGINE_FIELDS}
+        if row == len(self._docs):
+            self._docs.append(fields)
+            self._cards.append(card)
+        else:
+            self._docs[row] = fields
+            self._cards[row] = card
+        self._rows[fields["id"]] = row
+        for field in ENGINE_FIELDS:
+            if fields[field] is None:
+                self._missing[field] += 1
+
+        product_id = fields["id"]
+        if len(product_id) > self._ids.dtype.itemsize // 4:
+            self._ids = self._ids.astype(f"U{len(product_id)}")
+        self._ids[row] = product_id
+        self._price[row] = fields["price"] if fields["price"] is not None else np.nan
+        self._category[row] = self._category_codes.setdefault(fields["category"], len(self._category_codes))
+        self._alive[row] = True
+        self._sorted_ids = None
+
+    def _sort_key(self, field: str):
+        docs = self._docs
+        return lambda row: (docs[row][field], docs[row]["id"])
+
+    def _permutation(self, field: str) -> Optional[np.ndarray]:
+        # Строки по возрастанию (поле, id); None, если у части товаров поле пустое
+        if self._missing[field]:
+            return None
+        permutation = self._permutations.get(field)
+        if permutation is None:
+            rows = np.array(list(self._rows.values()), dtype=np.int64)
+            id_rank = np.unique(self._ids[rows], return_inverse=True)[1]
+            if field == "id":
+                order = np.argsort(id_rank, kind="stable")
+            else:
+                values = [self._docs[row][field] for row in rows.tolist()]
+                column = np.array(values, dtype="datetime64[ms]" if field == "created_at" else None)
+                field_rank = np.unique(column, return_inverse=True)[1]
+                # lexsort: последний ключ - главный
+                order = np.lexsort((id_rank, field_rank))
+            permutation = self._permutations[field] = rows[order]
+        return permutation
+
+    def _unlink(self, row: int) -> None:
+        # Убирает строку из перестановок и счетчиков перед изменением или удалением
+        doc = self._docs[row]
+        for field in SORTED_FIELDS:
+            permutation = self._permutations.get(field)
+            if permutation is not None and not self._missing[field]:
+                position = bisect_left(permutation, (doc[field], doc["id"]), key=self._sort_key(field))
+                self._permutations[field] = np.delete(permutation, position)
+        for field in ENGINE_FIELDS:
+            if doc[field] is None:
+                self._missing[field] -= 1
+                if not self._missing[field]:
+                    # Поле снова заполнено у всех: перестановка построится заново при запросе
+                    self._permutations.pop(field, None)
+        self._sorted_ids = None
+
+    def _link(self, row: int) -> None:
+        doc = self._docs[row]
+        for field in SORTED_FIELDS:
+            permutation = self._permutations.get(field)
+            if permutation is None:
+                continue
+            if self._missing[field]:
+                del self._permutations[field]
+                continue
+            position = bisect_left(permutation, (doc[field], doc["id"]), key=self._sort_key(field))
+            self._permutations[field] = np.insert(permutation, position, row)
+
+    def _compact(self) -> None:
+        alive = self._alive[:len(self._docs)]
+        new_rows = np.cumsum(alive) - 1
+        self._docs = [doc for doc in self._docs if doc is not None]
+        self._cards = [card for row, card in enumerate(self._cards) if alive[row]]
+        self._rows = {doc["id"]: row for row, doc in enumerate(self._docs)}
+        for name in ("_price", "_category", "_ids"):
+            column = getattr(self, name)
+            compacted = np.zeros(len(column), dtype=column.dtype)
+            compacted[:len(self._docs)] = column[:len(alive)][alive]
+            setattr(self, name, compacted)
+        self._alive[:] = False
+        self._alive[:len(self._docs)] = True
+        self._permutations = {field: new_rows[permutation] for field, permutation in self._permutations.items()}
+        self._sorted_ids = None
+
+    def query(
+        self,
+        category: Optional[str],
+        min_price: Optional[float],
+        max_price: Optional[float],
+        sort_by: Optional[str],
+        limit: Optional[int],
+        cursor: Optional[str],
+        page_size: int,
+        matches: Optional[Tuple[np.ndarray, np.ndarray]] = None
+    ) -> Optional[Any]:
+        """
+        Выполняет запрос каталога в памяти.
+
+        Args:
+            category: Категория
+            min_price: Минимальная цена
+            max_price: Максимальная цена
+            sort_by: Режим сортировки
+            limit: Размер страницы (None вместе с cursor=None - весь список)
+            cursor: Курсор keyset-пагинации
+            page_size: Размер страницы по умолчанию
+            matches: Результат поиска (id товаров, оценки релевантности) - выдача
+                ограничивается этими товарами, без sort_by сортируется по релевантности
+
+        Returns:
+            Список карточек, страница {"products", "next_cursor"} или None,
+            если запрос нельзя обслужить из снимка
+        """
+        if not self.loaded:
+            return None
+
+        paginated = limit is not None or cursor is not None
+        if matches is not None and sort_by not in SORT_FIELDS:
+            sort_by = RELEVANCE_SORT
+        if sort_by == RELEVANCE_SORT and matches is None:
+            return None
+        field, direction = get_sort_spec(sort_by)[0]
+        if field != "score" and self._missing[field]:
+            return None
+        if (min_price is not None or max_price is not None) and self._missing["price"]:
+            return None
+        keys = decode_cursor(cursor, sort_by) if cursor else None
+        if keys is not None and any(key is None for key in keys):
+            # Курсор выдан по товару без значения поля - такой порядок знает только MongoDB
+            return None
+
+        size = len(self._docs)
+        mask = self._alive[:size].copy()
+        if category is not None:
+            code = self._category_codes.get(category)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= self._category[:size] == code
+        prices = self._price[:size]
+        if min_price is not None:
+            mask &= prices >= min_price
+        if max_price is not None:
+            mask &= prices <= max_price
+
+        scores = None
+        if matches is not None:
+            rows, found = self._match_rows(matches[0])
+            ids, scores = matches[0][found], matches[1][found]
+            selected = mask[rows]
+            rows, ids, scores = rows[selected], ids[selected], scores[selected]
+            if sort_by == RELEVANCE_SORT:
+                if keys is not None:
+                    after = (scores < keys[0]) | ((scores == keys[0]) & (ids > keys[1]))
+                    rows, ids, scores = rows[after], ids[after], scores[after]
+                # По убыванию оценки, при равенстве - по id, как get_sort_spec(RELEVANCE_SORT)
+                order = np.lexsort((ids, -scores))
+                ordered, scores = rows[order], scores[order]
+            else:
+                mask = np.zeros(size, dtype=bool)
+                mask[rows] = True
+        if sort_by != RELEVANCE_SORT:
+            if sort_by is None and not paginated:
+                # Без сортировки MongoDB отдает товары в порядке вставки
+                ordered = np.flatnonzero(mask)
+            else:
+                ordered = self._ordered_rows(field, direction, keys)
+                ordered = ordered[mask[ordered]]
+
+        if not paginated:
+            return [self._cards[row] for row in ordered[:1000].tolist()]
+
+        page = limit or page_size
+        rows = ordered[:page + 1]
+        next_cursor = None
+        if len(rows) > page:
+            rows = rows[:page]
+            last = self._docs[rows[-1]]
+            if sort_by == RELEVANCE_SORT:
+                last = {**last, "score": float(scores[page - 1])}
+            next_cursor = encode_cursor(sort_by, last)
+        return {
+            "products": [self._cards[row] for row in rows.tolist()],
+            "next_cursor": next_cursor
+        }
+
+    def _ordered_rows(self, field: str, direction: int, keys: Optional[List[Any]]) -> np.ndarray:
+        # Строки в порядке сортировки, строго после позиции курсора
+        permutation = self._permutation(field)
+        if keys is None:
+            return permutation if direction == 1 else permutation[::-1]
+        position_key = (keys[0], keys[-1])
+        if direction == 1:
+            return permutation[bisect_right(permutation, position_key, key=self._sort_key(field)):]
+        return permutation[:bisect_left(permutation, position_key, key=self._sort_key(field))][::-1]
+
+    def _match_rows(self, ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Номера живых строк для id и маска id, которые есть в снимке
+        permutation = self._permutation("id")
+        if self._sorted_ids is None:
+            self._sorted_ids = self._ids[permutation]
+        if not len(self._sorted_ids):
+            return np.array([], dtype=np.int64), np.zeros(len(ids), dtype=bool)
+        positions = np.minimum(np.searchsorted(self._sorted_ids, ids), len(self._sorted_ids) - 1)
+        found = self._sorted_ids[positions] == ids
+        return permutation[positions[found]], found
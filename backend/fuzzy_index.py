@@ -0,0 +1,179 @@
+from array import array
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from search_index import split_words
+
+
+# Слова короче не исправляются: у них слишком много соседей на расстоянии 1
+MIN_WORD_LENGTH = 3
+
+
+def max_edit_distance(word: str) -> int:
+    """Допустимое число опечаток для слова: одна в коротких словах, две в длинных."""
+    return 1 if len(word) <= 5 else 2
+
+
+def trigrams(word: str) -> Set[str]:
+    """
+    Триграммы слова с отступами, как в pg_trgm: у "чай" это "  ч", " ча", "чай", "ай ".
+
+    Одна правка меняет не больше трех триграмм, поэтому слова на расстоянии k
+    делят с исходным хотя бы len(trigrams) - 3 * k триграмм.
+    """
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> Optional[int]:
+    """
+    Расстояние Левенштейна с отсечением.
+
+    Args:
+        a: Первое слово
+        b: Второе слово
+        max_distance: Максимальное интересующее расстояние
+
+    Returns:
+        Расстояние или None, если оно больше max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        # Значения в строке таблицы не убывают дальше минимума - можно остановиться
+        if min(current) > max_distance:
+            return None
+        previous = current
+    return previous[-1] if previous[-1] <= max_distance else None
+
+
+class TrigramIndex:
+    """
+    Триграммный индекс слов из названий товаров для исправления опечаток.
+
+    Индексируются не названия, а словарь слов: у каждого слова есть номер,
+    длина и число товаров, в названии которых оно встречается. Для каждой
+    триграммы хранится список номеров слов (array('I')).
+
+    Исправление слова: кандидаты - слова, у которых достаточно общих
+    триграмм (подсчет через np.bincount по спискам триграмм запроса) и
+    подходящая длина; затем кандидаты проверяются расстоянием Левенштейна
+    с отсечением. Сначала ищутся слова на расстоянии 1, затем 2, так что
+    дорогая проверка нужна только небольшому числу слов.
+
+    Слова, которые исчезли из всех названий, остаются в словаре с нулевым
+    счетчиком и не предлагаются.
+    """
+
+    def __init__(self):
+        self._word_ids: Dict[str, int] = {}
+        self._words: List[str] = []
+        self._lengths = array("I")
+        self._counts = array("I")
+        self._trigrams: Dict[str, array] = {}
+        self._product_words: Dict[str, Tuple[str, ...]] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._product_words)
+
+    def replace_all(self, docs: List[Dict[str, Any]]) -> None:
+        """
+        Заменяет индекс целиком.
+
+        Args:
+            docs: Документы активных товаров (нужны id и name)
+        """
+        self.__init__()
+        for doc in docs:
+            self.upsert(doc)
+        self.loaded = True
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        """Индексирует название товара, заменяя прежнее."""
+        self.remove(doc["id"])
+        words = tuple({word for word in split_words(doc.get("name")) if len(word) >= MIN_WORD_LENGTH})
+        self._product_words[doc["id"]] = words
+        for word in words:
+            self._counts[self._word_id(word)] += 1
+
+    def remove(self, product_id: str) -> None:
+        """Убирает товар из индекса."""
+        for word in self._product_words.pop(product_id, ()):
+            self._counts[self._word_ids[word]] -= 1
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self._words)
+            self._words.append(word)
+            self._lengths.append(len(word))
+            self._counts.append(0)
+            for trigram in trigrams(word):
+                postings = self._trigrams.get(trigram)
+                if postings is None:
+                    postings = self._trigrams[trigram] = array("I")
+                postings.append(word_id)
+        return word_id
+
+    def correct_word(self, word: str) -> Optional[str]:
+        """
+        Находит ближайшее известное слово.
+
+        Args:
+            word: Слово в нижнем регистре
+
+        Returns:
+            Само слово, если оно есть в названиях; ближайшее по числу правок
+            (при равенстве - самое частое) или None, если близких слов нет
+        """
+        word_id = self._word_ids.get(word)
+        if word_id is not None and self._counts[word_id]:
+            return word
+        if len(word) < MIN_WORD_LENGTH or not self._words:
+            return None
+
+        query_trigrams = trigrams(word)
+        postings = [np.frombuffer(self._trigrams[trigram], dtype=np.uint32)
+                    for trigram in query_trigrams if trigram in self._trigrams]
+        if not postings:
+            return None
+        shared = np.bincount(np.concatenate(postings), minlength=len(self._words))
+        lengths = np.frombuffer(self._lengths, dtype=np.uint32).astype(np.int64)
+        counts = np.frombuffer(self._counts, dtype=np.uint32)
+
+        for distance in range(1, max_edit_distance(word) + 1):
+            candidates = np.flatnonzero(
+                (shared >= max(1, len(query_trigrams) - 3 * distance))
+                & (np.abs(lengths - len(word)) <= distance)
+                & (counts > 0)
+            )
+            matches = [
+                candidate for candidate in candidates.tolist()
+                if bounded_levenshtein(word, self._words[candidate], distance) is not None
+            ]
+            if matches:
+                best = min(matches, key=lambda candidate: (-self._counts[candidate], self._words[candidate]))
+                return self._words[best]
+        return None
+
+    def correct(self, text: str) -> Optional[str]:
+        """
+        Исправляет опечатки в строке поиска ("возможно, вы имели в виду").
+
+        Args:
+            text: Строка поиска от пользователя
+
+        Returns:
+            Исправленная строка или None, если исправлять нечего
+        """
+        words = split_words(text)
+        corrected = [self.correct_word(word) or word for word in words]
+        if corrected == words:
+            return None
+        return " ".join(corrected)
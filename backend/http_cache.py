@@ -0,0 +1,116 @@
+import re
+from typing import List, Optional, Tuple
+
+
+# Контент-адресуемые ответы никогда не меняются по тому же URL
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiableError(ValueError):
+    """Запрошенный диапазон лежит за пределами объекта."""
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Проверяет заголовок If-None-Match против ETag ответа.
+
+    Args:
+        if_none_match: Значение заголовка If-None-Match
+        etag: ETag ответа в кавычках
+
+    Returns:
+        True если клиент уже имеет эту версию
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Слабое сравнение: W/"x" совпадает с "x" (RFC 9110, 13.1.2)
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Разбирает заголовок Range с одним диапазоном байтов.
+
+    Несколько диапазонов и нераспознанные единицы игнорируются, и клиент
+    получает объект целиком, как разрешает RFC 9110.
+
+    Args:
+        range_header: Значение заголовка Range
+        size: Размер объекта в байтах
+
+    Returns:
+        (start, end) включительно или None если отдавать объект целиком
+    """
+    if not range_header:
+        return None
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+
+    start_str, end_str = match.groups()
+    if not start_str and not end_str:
+        return None
+
+    if not start_str:
+        # bytes=-N: последние N байт
+        length = int(end_str)
+        if length == 0:
+            raise RangeNotSatisfiableError(range_header)
+        return max(size - length, 0), size - 1
+
+    start = int(start_str)
+    end = int(end_str) if end_str else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiableError(range_header)
+    return start, min(end, size - 1)
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    media_ranges = []
+    for item in accept.split(","):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        media_ranges.append((parts[0].lower(), quality))
+    return media_ranges
+
+
+def negotiate_media_type(accept: Optional[str], available: List[str], default: str) -> str:
+    """
+    Выбирает тип ответа по заголовку Accept.
+
+    Явно перечисленный тип с наибольшим q побеждает; при равенстве
+    предпочтение по порядку available, затем default. Подстановки
+    (image/*, */*) выбирают default, так как только его поддерживают
+    все клиенты.
+
+    Args:
+        accept: Значение заголовка Accept
+        available: Доступные типы в порядке предпочтения
+        default: Тип по умолчанию (должен быть среди доступных)
+
+    Returns:
+        Выбранный MIME тип
+    """
+    if not accept:
+        return default
+
+    explicit = {media_type: quality for media_type, quality in _parse_accept(accept)}
+    best, best_quality = default, 0.0
+    for media_type in available + [default]:
+        quality = explicit.get(media_type, 0.0)
+        if quality > best_quality:
+            best, best_quality = media_type, quality
+    return best
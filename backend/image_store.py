@@ -0,0 +1,263 @@
+import os
+import abc
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from pymongo.errors import DuplicateKeyError
+
+
+# Размер блока при потоковой отдаче объектов
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Вычисляет ключ содержимого.
+
+    Args:
+        data: Байты изображения
+
+    Returns:
+        SHA-256 в виде hex строки
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class ImageStore(abc.ABC):
+    """
+    Хранилище байтов изображений с адресацией по содержимому.
+
+    Ключ объекта - SHA-256 его байтов, поэтому повторная загрузка того же
+    файла не создает копию: put просто возвращает существующий ключ.
+    """
+
+    async def put(self, data: bytes) -> str:
+        """
+        Сохраняет байты, если такого содержимого еще нет.
+
+        Args:
+            data: Байты изображения
+
+        Returns:
+            Ключ (SHA-256) сохраненного объекта
+        """
+        key = content_hash(data)
+        if not await self.exists(key):
+            await self._write(key, data)
+        return key
+
+    async def put_at(self, key: str, data: bytes) -> None:
+        """
+        Сохраняет байты под заданным ключом, а не под ключом содержимого.
+
+        Нужно для временных объектов, у которых должен быть свой владелец:
+        одинаковые исходники двух задач не должны делить один объект.
+
+        Args:
+            key: Ключ объекта
+            data: Байты изображения
+        """
+        await self._write(key, data)
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        """Возвращает байты объекта или None, если его нет."""
+
+    @abc.abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Проверяет наличие объекта."""
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        """Удаляет объект, если он есть."""
+
+    @abc.abstractmethod
+    async def size(self, key: str) -> Optional[int]:
+        """Возвращает размер объекта в байтах или None, если его нет."""
+
+    @abc.abstractmethod
+    def iter_range(
+        self,
+        key: str,
+        start: int,
+        end: int,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        """
+        Читает байты объекта блоками, не загружая его в память целиком.
+
+        Args:
+            key: Ключ объекта
+            start: Первый байт диапазона
+            end: Последний байт диапазона (включительно)
+            chunk_size: Размер блока
+
+        Returns:
+            Асинхронный итератор блоков
+        """
+
+    @abc.abstractmethod
+    async def _write(self, key: str, data: bytes) -> None:
+        """Записывает байты под ключом (запись уже существующего ключа не ошибка)."""
+
+
+class GridFSImageStore(ImageStore):
+    """Хранилище в GridFS: _id файла совпадает с ключом содержимого."""
+
+    def __init__(self, db: AsyncIOMotorDatabase, bucket_name: str = "image_blobs"):
+        self.bucket = AsyncIOMotorGridFSBucket(db, bucket_name=bucket_name)
+        self.files = db[f"{bucket_name}.files"]
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if not await self.exists(key):
+            return None
+        stream = await self.bucket.open_download_stream(key)
+        return await stream.read()
+
+    async def exists(self, key: str) -> bool:
+        return await self.files.find_one({"_id": key}, {"_id": 1}) is not None
+
+    async def delete(self, key: str) -> None:
+        if await self.exists(key):
+            await self.bucket.delete(key)
+
+    async def size(self, key: str) -> Optional[int]:
+        file_doc = await self.files.find_one({"_id": key}, {"length": 1})
+        return file_doc["length"] if file_doc else None
+
+    async def iter_range(
+        self,
+        key: str,
+        start: int,
+        end: int,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        stream = await self.bucket.open_download_stream(key)
+        stream.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await stream.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    async def _write(self, key: str, data: bytes) -> None:
+        try:
+            await self.bucket.upload_from_stream_with_id(key, key, data)
+        except DuplicateKeyError:
+            # Параллельная загрузка того же содержимого уже записала объект
+            pass
+
+
+class LocalImageStore(ImageStore):
+    """Хранилище на локальном диске: root/ab/cd/<sha256>."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / key[2:4] / key
+
+    async def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except FileNotFoundError:
+            return None
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(self._path(key).exists)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self._path(key).unlink, missing_ok=True)
+
+    async def size(self, key: str) -> Optional[int]:
+        try:
+            stat = await asyncio.to_thread(self._path(key).stat)
+        except FileNotFoundError:
+            return None
+        return stat.st_size
+
+    async def iter_range(
+        self,
+        key: str,
+        start: int,
+        end: int,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> AsyncIterator[bytes]:
+        file = await asyncio.to_thread(open, self._path(key), "rb")
+        try:
+            await asyncio.to_thread(file.seek, start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(file.read, min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            file.close()
+
+    async def _write(self, key: str, data: bytes) -> None:
+        await asyncio.to_thread(self._write_sync, key, data)
+
+    def _write_sync(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Пишем во временный файл и атомарно переименовываем,
+        # чтобы читатели никогда не видели недописанный объект
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+
+def create_image_store(db: AsyncIOMotorDatabase) -> ImageStore:
+    """
+    Создает хранилище по переменным окружения.
+
+    IMAGE_STORE_BACKEND: gridfs (по умолчанию) или local
+    IMAGE_STORE_PATH: каталог для local (по умолчанию ./image_store рядом с сервером)
+
+    Args:
+        db: База данных MongoDB для GridFS
+
+    Returns:
+        Экземпляр ImageStore
+    """
+    backend = os.environ.get("IMAGE_STORE_BACKEND", "gridfs").lower()
+    if backend == "local":
+        default_path = Path(__file__).parent / "image_store"
+        return LocalImageStore(os.environ.get("IMAGE_STORE_PATH", str(default_path)))
+    if backend == "gridfs":
+        return GridFSImageStore(db)
+    raise ValueError(f"Unknown IMAGE_STORE_BACKEND: {backend}")
+
+
+def create_staging_store(db: AsyncIOMotorDatabase) -> ImageStore:
+    """
+    Создает хранилище исходников, ожидающих фоновой обработки.
+
+    Исходники держатся отдельно от основного хранилища, чтобы их можно было
+    удалить после обработки, не задев совпадающий по содержимому объект,
+    на который ссылаются товары. Бэкенд тот же, что у основного хранилища.
+    Исходники пишутся через put_at под ключом задачи, а не под ключом содержимого.
+
+    IMAGE_STAGING_PATH: каталог для local (по умолчанию ./image_staging рядом с сервером)
+
+    Args:
+        db: База данных MongoDB для GridFS
+
+    Returns:
+        Экземпляр ImageStore
+    """
+    backend = os.environ.get("IMAGE_STORE_BACKEND", "gridfs").lower()
+    if backend == "local":
+        default_path = Path(__file__).parent / "image_staging"
+        return LocalImageStore(os.environ.get("IMAGE_STAGING_PATH", str(default_path)))
+    if backend == "gridfs":
+        return GridFSImageStore(db, bucket_name="image_staging")
+    raise ValueError(f"Unknown IMAGE_STORE_BACKEND: {backend}")
@@ -1,120 +1,533 @@
 import io
+import os
 import base64
-from PIL import Image
-from typing import Optional, Tuple
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, features
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
 
-def compress_image(
-    base64_image: str, 
-    quality: int = 85, 
-    max_size: Tuple[int, int] = (1200, 1200),
-    format: str = "JPEG"
-) -> str:
+# Уменьшенные варианты, которые генерируются один раз при записи товара.
+# quality - верхняя граница качества, max_bytes - бюджет размера варианта:
+# если при quality файл больше бюджета, качество подбирается бисекцией
+IMAGE_VARIANTS = {
+    "thumbnail": {"max_size": (300, 300), "quality": 80, "max_bytes": 20 * 1024},
+    "small": {"max_size": (600, 600), "quality": 80, "max_bytes": 60 * 1024},
+    "medium": {"max_size": (900, 900), "quality": 85, "max_bytes": 120 * 1024},
+}
+
+
+# Основной вариант, из которого отдаются изображения товара
+FULL_VARIANT = {"max_size": (1200, 1200), "quality": 85, "max_bytes": 250 * 1024}
+
+# Крошечное превью (LQIP), которое карточки показывают до загрузки изображения:
+# вместе с префиксом data URI укладывается в 1KB
+PLACEHOLDER_VARIANT = {"max_size": (24, 24), "quality": 50, "max_bytes": 700}
+
+# Сторона сетки перцептивного хеша: 8 дает 64-битный dHash
+DHASH_SIZE = 8
+
+# Границы подбора качества под бюджет размера
+MIN_BUDGET_QUALITY = 40
+MAX_BUDGET_ATTEMPTS = 6
+
+IMAGE_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "AVIF": "image/avif",
+}
+
+# При равном визуальном качестве AVIF допускает более низкое значение quality
+FORMAT_QUALITY_OFFSET = {
+    "AVIF": -20,
+}
+
+# Параметры кодеров: AVIF по умолчанию (speed=6) кодирует в разы дольше JPEG
+FORMAT_SAVE_OPTIONS = {
+    "JPEG": {"optimize": True},
+    "PNG": {"optimize": True},
+    "WEBP": {"method": 4},
+    "AVIF": {"speed": 8},
+}
+
+
+def _avif_supported() -> bool:
+    try:
+        return features.check_module("avif")
+    except ValueError:
+        # Pillow без встроенного AVIF: кодер может быть зарегистрирован плагином
+        Image.init()
+        return "AVIF" in Image.SAVE
+
+
+def _alternate_formats() -> List[str]:
+    configured = os.environ.get("IMAGE_ALTERNATE_FORMATS", "WEBP,AVIF")
+    formats = [name.strip().upper() for name in configured.split(",") if name.strip()]
+    return [name for name in formats if name in IMAGE_MIME_TYPES and name != "JPEG" and (name != "AVIF" or _avif_supported())]
+
+
+# Дополнительные форматы, которые генерируются при записи рядом с JPEG
+# (IMAGE_ALTERNATE_FORMATS, AVIF - только если Pillow умеет его кодировать)
+ALTERNATE_FORMATS = _alternate_formats()
+
+
+def fit_size(size: Tuple[int, int], max_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Размер, вписанный в max_size с сохранением пропорций (без увеличения)."""
+    width, height = size
+    scale = min(max_size[0] / width, max_size[1] / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _to_rgb(img: Image.Image) -> Image.Image:
+    """Приводит изображение к RGB/L, подкладывая белый фон под прозрачность."""
+    if img.mode == 'P':
+        img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+    if img.mode in ('RGBA', 'LA'):
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    if img.mode not in ('RGB', 'L'):
+        return img.convert('RGB')
+    return img
+
+
+class ImagePipeline:
     """
-    Сжимает изображение из base64 строки.
+    Обработка изображения с однократным декодированием.
     
-    Args:
-        base64_image: Base64 строка изображения
-        quality: Качество сжатия (1-100)
-        max_size: Максимальный размер изображения (ширина, высота)
-        format: Формат изображения (JPEG, PNG, WebP)
-    
-    Returns:
-        Сжатая base64 строка
+    Файл открывается один раз, метаданные берутся из заголовка, а пиксели
+    декодируются сразу в уменьшенном виде: для JPEG через draft (масштаб
+    1/2, 1/4, 1/8 прямо в DCT-декодере), для остальных форматов через
+    Image.reduce. Все варианты затем строятся из этого декодированного
+    изображения, от большего к меньшему.
     """
-    try:
-        # Декодируем base64
-        image_data = base64.b64decode(base64_image)
+
+    # Во сколько раз промежуточное изображение должно оставаться больше целевого
+    # после быстрого уменьшения (аналог reducing_gap в Pillow). Значение 2.0, как в
+    # Image.thumbnail, почти никогда не включает draft для фото 4000x3000 -> 1200,
+    # 1.5 дает масштаб 1/2 в декодере при незаметной разнице в качестве
+    REDUCING_GAP = 1.5
+
+    def __init__(self, image_data: bytes):
+        """
+        Args:
+            image_data: Байты исходного изображения
+        """
+        self.size_bytes = len(image_data)
+        self._img = Image.open(io.BytesIO(image_data))
+        self.format = self._img.format
+        self.mode = self._img.mode
+        self.width, self.height = self._img.size
+        self._decoded: Optional[Image.Image] = None
+
+    def decode(self, max_size: Tuple[int, int]) -> Image.Image:
+        """
+        Декодирует пиксели в наименьшем разрешении, достаточном для max_size.
         
-        # Открываем изображение
-        with Image.open(io.BytesIO(image_data)) as img:
-            # Конвертируем в RGB если это RGBA (для JPEG)
-            if img.mode in ('RGBA', 'LA') and format == 'JPEG':
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                img = background
-            
-            # Изменяем размер если нужно
-            if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            
-            # Сжимаем изображение
-            output = io.BytesIO()
-            img.save(output, format=format, quality=quality, optimize=True)
-            
-            # Кодируем обратно в base64
-            compressed_data = output.getvalue()
-            return base64.b64encode(compressed_data).decode('utf-8')
-            
-    except Exception as e:
-        print(f"Ошибка сжатия изображения: {e}")
-        return base64_image  # Возвращаем оригинал если не удалось сжать
+        Args:
+            max_size: Наибольший размер, который понадобится
+        
+        Returns:
+            Декодированное RGB/L изображение
+        """
+        if self._decoded is not None:
+            return self._decoded
+        
+        img = self._img
+        target = fit_size(img.size, max_size)
+        gap = self.REDUCING_GAP
+        if img.format == 'JPEG' and target != img.size:
+            # Декодер сам уменьшит изображение, но не меньше чем target * gap
+            img.draft('RGB', (int(target[0] * gap), int(target[1] * gap)))
+        img.load()
+        
+        factor = int(min(img.width / (target[0] * gap), img.height / (target[1] * gap)))
+        if factor >= 2:
+            img = img.reduce(factor)
+        
+        self._decoded = _to_rgb(img)
+        return self._decoded
 
+    def render(self, specs: Dict[str, dict], format: str = "JPEG") -> Dict[str, bytes]:
+        """
+        Строит и кодирует все варианты за один проход.
+        
+        Args:
+            specs: Описание вариантов {имя: {max_size, quality, max_bytes}}
+            format: Формат результата
+        
+        Returns:
+            Словарь {имя варианта: байты}
+        """
+        rendered = self.render_formats(specs, [format])
+        return {name: encoded[format] for name, encoded in rendered.items()}
 
-def create_thumbnail(
-    base64_image: str, 
-    size: Tuple[int, int] = (300, 300),
-    quality: int = 80
-) -> str:
+    def render_formats(self, specs: Dict[str, dict], formats: List[str]) -> Dict[str, Dict[str, bytes]]:
+        """
+        Строит все варианты и кодирует каждый сразу в несколько форматов.
+        
+        Args:
+            specs: Описание вариантов {имя: {max_size, quality, max_bytes}}
+            formats: Форматы результата (JPEG, WEBP, AVIF)
+        
+        Returns:
+            Словарь {имя варианта: {формат: байты}}
+        """
+        by_area = sorted(specs.items(), key=lambda item: item[1]["max_size"][0] * item[1]["max_size"][1], reverse=True)
+        largest = by_area[0][1]["max_size"]
+        
+        source = self.decode(largest)
+        result = {}
+        for name, spec in by_area:
+            target = fit_size(source.size, spec["max_size"])
+            # Каждый следующий вариант уменьшается из предыдущего, а не из оригинала
+            if target != source.size:
+                source = source.resize(target, Image.Resampling.LANCZOS)
+            result[name] = {
+                format: self.encode_to_budget(
+                    source,
+                    max_bytes=spec.get("max_bytes"),
+                    format=format,
+                    quality=spec["quality"] + FORMAT_QUALITY_OFFSET.get(format, 0)
+                )
+                for format in formats
+            }
+        return result
+
+    def dhash(self, hash_size: int = DHASH_SIZE) -> str:
+        """
+        Перцептивный хеш (dHash) изображения.
+        
+        Изображение уменьшается до (hash_size + 1) x hash_size в оттенках
+        серого, и каждый бит показывает, светлее ли пиксель своего правого
+        соседа. Хеш почти не меняется при пересжатии, смене формата и
+        размера, поэтому близкие по расстоянию Хэмминга хеши означают
+        одну и ту же картинку.
+        
+        Args:
+            hash_size: Сторона сетки (hash_size * hash_size бит)
+        
+        Returns:
+            Хеш в виде hex строки
+        """
+        gray = self.decode((hash_size * 16, hash_size * 16)).convert('L')
+        pixels = list(gray.resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS).getdata())
+        bits = 0
+        for row in range(hash_size):
+            for col in range(hash_size):
+                left = pixels[row * (hash_size + 1) + col]
+                right = pixels[row * (hash_size + 1) + col + 1]
+                bits = (bits << 1) | (left > right)
+        return f"{bits:0{hash_size * hash_size // 4}x}"
+
+    def placeholder(self, spec: dict = PLACEHOLDER_VARIANT) -> str:
+        """
+        Строит LQIP превью из уже декодированного изображения.
+        
+        Args:
+            spec: Описание превью {max_size, quality, max_bytes}
+        
+        Returns:
+            data URI с JPEG превью
+        """
+        preview = self.decode(spec["max_size"]).copy()
+        preview.thumbnail(spec["max_size"], Image.Resampling.BILINEAR, reducing_gap=2.0)
+        data = self.encode_to_budget(preview, max_bytes=spec["max_bytes"], format="JPEG", quality=spec["quality"])
+        return f"data:image/jpeg;base64,{base64.b64encode(data).decode('ascii')}"
+
+    @staticmethod
+    def encode(img: Image.Image, format: str = "JPEG", quality: int = 85) -> bytes:
+        output = io.BytesIO()
+        img.save(output, format=format, quality=quality, **FORMAT_SAVE_OPTIONS.get(format, {}))
+        return output.getvalue()
+
+    @classmethod
+    def encode_to_budget(
+        cls,
+        img: Image.Image,
+        max_bytes: Optional[int],
+        format: str = "JPEG",
+        quality: int = 85,
+        min_quality: int = MIN_BUDGET_QUALITY,
+        max_attempts: int = MAX_BUDGET_ATTEMPTS
+    ) -> bytes:
+        """
+        Кодирует изображение с наибольшим качеством, укладывающимся в бюджет.
+        
+        Сначала пробуется quality; если результат больше max_bytes, качество
+        подбирается бисекцией в [min_quality, quality) не более чем за
+        max_attempts кодирований. Если бюджет недостижим даже при min_quality,
+        возвращается самый маленький из полученных результатов.
+        
+        Args:
+            img: Изображение
+            max_bytes: Бюджет размера в байтах (None - без ограничения)
+            format: Формат результата
+            quality: Верхняя граница качества
+            min_quality: Нижняя граница качества
+            max_attempts: Максимум попыток кодирования
+        
+        Returns:
+            Байты изображения
+        """
+        encoded = cls.encode(img, format=format, quality=quality)
+        if max_bytes is None or len(encoded) <= max_bytes:
+            return encoded
+        
+        smallest = encoded
+        best = None
+        low, high = min_quality, quality - 1
+        attempts = 1
+        while low <= high and attempts < max_attempts:
+            mid = (low + high) // 2
+            candidate = cls.encode(img, format=format, quality=mid)
+            attempts += 1
+            if len(candidate) <= max_bytes:
+                best = candidate
+                low = mid + 1
+            else:
+                if len(candidate) < len(smallest):
+                    smallest = candidate
+                high = mid - 1
+        
+        if best is None and low <= min_quality and attempts < max_attempts:
+            # Бисекция не дошла до нижней границы - проверяем ее явно
+            candidate = cls.encode(img, format=format, quality=min_quality)
+            if len(candidate) <= max_bytes:
+                best = candidate
+            elif len(candidate) < len(smallest):
+                smallest = candidate
+        
+        return best if best is not None else smallest
+
+    def close(self) -> None:
+        self._img.close()
+
+
+def estimate_base64_size(base64_image: str) -> int:
     """
-    Создает миниатюру изображения.
+    Размер декодированных данных по длине base64 строки, без декодирования.
     
     Args:
-        base64_image: Base64 строка изображения
-        size: Размер миниатюры
-        quality: Качество сжатия
+        base64_image: Base64 строка
     
     Returns:
-        Base64 строка миниатюры
+        Размер в байтах
     """
-    return compress_image(
-        base64_image, 
-        quality=quality, 
-        max_size=size, 
-        format="JPEG"
-    )
+    length = len(base64_image)
+    padding = len(base64_image) - len(base64_image.rstrip("="))
+    return length * 3 // 4 - padding
+
 
+class ImageTooLargeError(ValueError):
+    """Изображение превышает допустимый размер."""
 
-def get_image_info(base64_image: str) -> Optional[dict]:
+
+class InvalidImageError(ValueError):
+    """Данные не являются поддерживаемым изображением."""
+
+
+class ImagePoolBusyError(RuntimeError):
+    """Очередь обработки изображений переполнена."""
+
+
+def decode_base64_image(base64_image: str, max_size_mb: int = 10) -> bytes:
     """
-    Получает информацию об изображении.
+    Декодирует base64 изображение с проверкой размера.
+    
+    Размер сначала оценивается по длине строки, чтобы не декодировать
+    заведомо слишком большие данные.
     
     Args:
         base64_image: Base64 строка изображения
+        max_size_mb: Максимальный размер в МБ
     
     Returns:
-        Словарь с информацией об изображении
+        Байты изображения
     """
+    max_bytes = max_size_mb * 1024 * 1024
+    if estimate_base64_size(base64_image) > max_bytes:
+        raise ImageTooLargeError(f"Image exceeds {max_size_mb}MB")
+    
     try:
         image_data = base64.b64decode(base64_image)
-        
-        with Image.open(io.BytesIO(image_data)) as img:
-            return {
-                'width': img.width,
-                'height': img.height,
-                'format': img.format,
-                'mode': img.mode,
-                'size_bytes': len(image_data)
-            }
-    except Exception as e:
-        print(f"Ошибка получения информации об изображении: {e}")
-        return None
+    except Exception:
+        raise InvalidImageError("Invalid base64 image data")
+    
+    if len(image_data) > max_bytes:
+        raise ImageTooLargeError(f"Image exceeds {max_size_mb}MB")
+    return image_data
 
 
-def validate_image_size(base64_image: str, max_size_mb: int = 10) -> bool:
+def process_image(image_data: bytes) -> dict:
     """
-    Проверяет размер изображения.
+    Полная обработка одного изображения товара: сжатие и уменьшенные варианты.
+    
+    Выполняется в рабочем процессе пула, поэтому объявлена на уровне модуля.
+    Изображение декодируется один раз, результат - готовые байты для
+    хранилища изображений.
     
     Args:
-        base64_image: Base64 строка изображения
-        max_size_mb: Максимальный размер в МБ
+        image_data: Байты исходного изображения
     
     Returns:
-        True если размер в пределах нормы
+        Словарь {width, height, content_type, placeholder, phash, variants: {имя: байты},
+        alternates: {имя: {MIME тип: байты}}}, где размеры относятся
+        к варианту "full", alternates содержит WebP/AVIF версии,
+        placeholder - LQIP превью в виде data URI, а phash - перцептивный хеш
     """
     try:
-        image_data = base64.b64decode(base64_image)
-        size_mb = len(image_data) / (1024 * 1024)
-        return size_mb <= max_size_mb
-    except:
-        return False
\ No newline at end of file
+        pipeline = ImagePipeline(image_data)
+        try:
+            rendered = pipeline.render_formats({"full": FULL_VARIANT, **IMAGE_VARIANTS}, ["JPEG"] + ALTERNATE_FORMATS)
+            width, height = fit_size(pipeline.decode(FULL_VARIANT["max_size"]).size, FULL_VARIANT["max_size"])
+            placeholder = pipeline.placeholder()
+            phash = pipeline.dhash()
+        finally:
+            pipeline.close()
+    except Exception as e:
+        raise InvalidImageError(f"Cannot process image: {e}")
+    
+    return {
+        "width": width,
+        "height": height,
+        "content_type": IMAGE_MIME_TYPES["JPEG"],
+        "placeholder": placeholder,
+        "phash": phash,
+        "variants": {name: encoded["JPEG"] for name, encoded in rendered.items()},
+        "alternates": {
+            name: {IMAGE_MIME_TYPES[format]: encoded[format] for format in ALTERNATE_FORMATS}
+            for name, encoded in rendered.items()
+        }
+    }
+
+
+def resize_image(image_data: bytes, max_size: Tuple[int, int], format: str = "JPEG") -> bytes:
+    """
+    Уменьшенная копия произвольного размера для запроса клиента.
+
+    Выполняется в рабочем процессе пула. Изображение только уменьшается:
+    если max_size больше исходника, возвращается копия исходного размера.
+
+    Args:
+        image_data: Байты исходного изображения (обычно вариант "full")
+        max_size: Прямоугольник, в который вписывается результат
+        format: Формат результата (JPEG, WEBP, AVIF)
+
+    Returns:
+        Байты изображения
+    """
+    try:
+        pipeline = ImagePipeline(image_data)
+        try:
+            spec = {"max_size": max_size, "quality": FULL_VARIANT["quality"]}
+            return pipeline.render({"image": spec}, format)["image"]
+        finally:
+            pipeline.close()
+    except Exception as e:
+        raise InvalidImageError(f"Cannot resize image: {e}")
+
+
+class ImageWorkerPool:
+    """
+    Пул процессов для CPU-тяжелой обработки изображений.
+    
+    Pillow держит GIL на время ресайза и кодирования, поэтому обработка в
+    потоке или прямо в обработчике запроса останавливает весь event loop.
+    Пул выносит ее в отдельные процессы, а семафор ограничивает число задач
+    в работе и очереди: при переполнении вызывающий ждет не дольше
+    queue_timeout секунд и получает ImagePoolBusyError.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        queue_timeout: float = 30.0
+    ):
+        """
+        Args:
+            max_workers: Число процессов (по умолчанию число ядер)
+            max_pending: Максимум задач в работе и очереди (по умолчанию 2 * max_workers)
+            queue_timeout: Сколько секунд ждать свободного места в очереди
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.max_workers * 2
+        self.queue_timeout = queue_timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @classmethod
+    def from_env(cls) -> "ImageWorkerPool":
+        """Создает пул по переменным окружения IMAGE_WORKERS, IMAGE_MAX_PENDING, IMAGE_QUEUE_TIMEOUT."""
+        return cls(
+            max_workers=int(os.environ.get("IMAGE_WORKERS", 0)) or None,
+            max_pending=int(os.environ.get("IMAGE_MAX_PENDING", 0)) or None,
+            queue_timeout=float(os.environ.get("IMAGE_QUEUE_TIMEOUT", 30))
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: форк процесса с потоками motor/uvicorn небезопасен
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        return self._semaphore
+
+    async def submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Выполняет функцию в пуле процессов с учетом backpressure.
+        
+        Args:
+            fn: Функция уровня модуля (должна сериализоваться pickle)
+            *args: Аргументы функции
+        
+        Returns:
+            Результат функции
+        """
+        semaphore = self._get_semaphore()
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ImagePoolBusyError("Image processing queue is full")
+        
+        executor = self._get_executor()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # Рабочий процесс упал (например, из-за нехватки памяти): такой пул
+            # больше не принимает задач, поэтому следующий вызов создаст новый
+            if self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            raise ImagePoolBusyError("Image worker process crashed")
+        finally:
+            semaphore.release()
+
+    async def map(self, fn: Callable[..., Any], items: Iterable[Any]) -> List[Any]:
+        """
+        Обрабатывает элементы параллельно на всех процессах пула.
+        
+        Args:
+            fn: Функция уровня модуля
+            items: Аргументы для каждого вызова
+        
+        Returns:
+            Результаты в исходном порядке
+        """
+        return list(await asyncio.gather(*(self.submit(fn, item) for item in items)))
+
+    def shutdown(self) -> None:
+        """Останавливает рабочие процессы."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,184 @@
+import base64
+import json
+import math
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Размер страницы по умолчанию и верхняя граница для параметра limit
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Режимы сортировки каталога: поле и направление
+SORT_FIELDS: Dict[str, Tuple[str, int]] = {
+    "price_low": ("price", 1),
+    "price_high": ("price", -1),
+    "name": ("name", 1),
+    "newest": ("created_at", -1),
+    "oldest": ("created_at", 1),
+}
+
+# Сортировка результатов полнотекстового поиска: поле score добавляет сам запрос
+RELEVANCE_SORT = "relevance"
+
+# Допустимые типы значений ключей курсора по полям сортировки
+_NUMBER = "number"
+_KEY_TYPES: Dict[str, Any] = {
+    "price": _NUMBER,
+    "score": _NUMBER,
+    "name": str,
+    "id": str,
+    "created_at": datetime,
+}
+
+
+class InvalidCursorError(ValueError):
+    """Курсор поврежден или не соответствует режиму сортировки."""
+
+
+def sort_mode(sort_by: Optional[str]) -> Optional[str]:
+    """
+    Приводит режим сортировки к известному: неизвестные значения - порядок по умолчанию.
+
+    Args:
+        sort_by: Режим сортировки из запроса
+
+    Returns:
+        Режим из SORT_FIELDS, RELEVANCE_SORT или None
+    """
+    return sort_by if sort_by in SORT_FIELDS or sort_by == RELEVANCE_SORT else None
+
+
+def get_sort_spec(sort_by: Optional[str]) -> List[Tuple[str, int]]:
+    """
+    Возвращает спецификацию сортировки со стабильным разрешением равенств по id.
+
+    Args:
+        sort_by: Режим сортировки (price_low, price_high, name, newest, oldest, relevance)
+
+    Returns:
+        Список пар (поле, направление) для cursor.sort()
+    """
+    if sort_by == RELEVANCE_SORT:
+        return [("score", -1), ("id", 1)]
+    if sort_by in SORT_FIELDS:
+        field, direction = SORT_FIELDS[sort_by]
+        return [(field, direction), ("id", direction)]
+    return [("id", 1)]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and list(value) == ["$dt"] and isinstance(value["$dt"], str):
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def _is_valid_key(field: str, value: Any) -> bool:
+    # Курсор приходит от клиента: в фильтр MongoDB попадают только значения ожидаемого типа,
+    # иначе {"$regex": ...} или другой оператор стал бы частью запроса
+    if value is None:
+        # Пропущенное поле у товара (кроме id) - курсор мог быть выдан по такому документу
+        return field != "id"
+    expected = _KEY_TYPES[field]
+    if expected is _NUMBER:
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    if expected is datetime:
+        return isinstance(value, datetime) and value.tzinfo is None
+    return isinstance(value, expected)
+
+
+def encode_cursor(sort_by: Optional[str], document: Dict[str, Any]) -> str:
+    """
+    Кодирует позицию последнего документа страницы в непрозрачный курсор.
+
+    Args:
+        sort_by: Режим сортировки, с которым была получена страница
+        document: Последний документ страницы
+
+    Returns:
+        URL-безопасная base64 строка
+    """
+    payload = {
+        "s": sort_mode(sort_by),
+        "k": [_encode_value(document.get(field)) for field, _ in get_sort_spec(sort_by)],
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: Optional[str]) -> List[Any]:
+    """
+    Декодирует курсор и проверяет, что он выдан для того же режима сортировки
+    и значения ключей имеют типы полей сортировки.
+
+    Args:
+        cursor: Курсор из предыдущего ответа
+        sort_by: Текущий режим сортировки
+
+    Returns:
+        Значения ключей сортировки последнего документа
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        keys = [_decode_value(value) for value in payload["k"]]
+        cursor_sort = payload["s"]
+    except Exception:
+        raise InvalidCursorError("Malformed cursor")
+
+    if cursor_sort != sort_mode(sort_by):
+        raise InvalidCursorError("Cursor does not match sort order")
+    spec = get_sort_spec(sort_by)
+    if not isinstance(payload["k"], list) or len(keys) != len(spec):
+        raise InvalidCursorError("Malformed cursor")
+    if not all(_is_valid_key(field, key) for (field, _), key in zip(spec, keys)):
+        raise InvalidCursorError("Malformed cursor")
+    return keys
+
+
+def build_keyset_filter(sort_by: Optional[str], keys: List[Any]) -> Dict[str, Any]:
+    """
+    Строит условие "строго после курсора" для keyset-пагинации.
+
+    Для сортировки (field, id) это field > v OR (field == v AND id > last_id),
+    с заменой > на < при убывающем направлении. Такое условие обслуживается
+    одним диапазонным проходом по составному индексу (status, field, id).
+
+    Args:
+        sort_by: Режим сортировки
+        keys: Значения ключей сортировки из курсора
+
+    Returns:
+        Фильтр MongoDB
+    """
+    spec = get_sort_spec(sort_by)
+    clauses = []
+    for i, (field, direction) in enumerate(spec):
+        op = "$gt" if direction == 1 else "$lt"
+        clause = {prev_field: keys[j] for j, (prev_field, _) in enumerate(spec[:i])}
+        clause[field] = {op: keys[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def apply_cursor(query: Dict[str, Any], cursor: str, sort_by: Optional[str]) -> Dict[str, Any]:
+    """
+    Добавляет keyset-условие курсора к запросу, не затирая существующий $or.
+
+    Args:
+        query: Фильтр MongoDB
+        cursor: Курсор из предыдущего ответа
+        sort_by: Режим сортировки
+
+    Returns:
+        Тот же фильтр с добавленным условием
+    """
+    keys = decode_cursor(cursor, sort_by)
+    query.setdefault("$and", []).append(build_keyset_filter(sort_by, keys))
+    return query
@@ -0,0 +1,115 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Число различающихся бит двух хешей."""
+    return bin(a ^ b).count("1")
+
+
+class BKTree:
+    """
+    BK-дерево для поиска близких перцептивных хешей.
+
+    Каждый узел хранит хеш и детей, разложенных по расстоянию Хэмминга до
+    него. Благодаря неравенству треугольника поиск в радиусе r обходит
+    только детей с расстоянием в [d - r, d + r], а не все дерево.
+    Узел с одинаковым хешем хранит все ключи с этим хешем.
+    """
+
+    def __init__(self):
+        self._root: Optional[list] = None  # [хеш, [ключи], {расстояние: узел}]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, phash: int, key: str) -> None:
+        """
+        Добавляет ключ с перцептивным хешем.
+
+        Args:
+            phash: Хеш в виде целого числа
+            key: Ключ изображения (SHA-256 содержимого)
+        """
+        self._size += 1
+        if self._root is None:
+            self._root = [phash, [key], {}]
+            return
+
+        node = self._root
+        while True:
+            distance = hamming_distance(phash, node[0])
+            if distance == 0:
+                node[1].append(key)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [phash, [key], {}]
+                return
+            node = child
+
+    def search(self, phash: int, max_distance: int) -> List[Tuple[int, str]]:
+        """
+        Находит все ключи с хешем не дальше max_distance.
+
+        Args:
+            phash: Искомый хеш
+            max_distance: Максимальное расстояние Хэмминга
+
+        Returns:
+            Список (расстояние, ключ), отсортированный по расстоянию
+        """
+        found = []
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(phash, node[0])
+            if distance <= max_distance:
+                found.extend((distance, key) for key in node[1])
+            for child_distance, child in node[2].items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        found.sort()
+        return found
+
+    @classmethod
+    def from_items(cls, items: Iterable[Tuple[int, str]]) -> "BKTree":
+        tree = cls()
+        for phash, key in items:
+            tree.add(phash, key)
+        return tree
+
+
+def find_duplicate_groups(hashes: Dict[str, int], max_distance: int) -> List[List[str]]:
+    """
+    Группирует ключи с близкими перцептивными хешами.
+
+    Группа - компонента связности по отношению "расстояние <= max_distance",
+    поэтому цепочка A~B~C попадает в одну группу, даже если A и C дальше.
+
+    Args:
+        hashes: Словарь {ключ: хеш}
+        max_distance: Максимальное расстояние Хэмминга
+
+    Returns:
+        Группы из двух и более ключей
+    """
+    tree = BKTree.from_items((phash, key) for key, phash in hashes.items())
+    parent = {key: key for key in hashes}
+
+    def find(key: str) -> str:
+        while parent[key] != key:
+            parent[key] = parent[parent[key]]
+            key = parent[key]
+        return key
+
+    for key, phash in hashes.items():
+        for _, other in tree.search(phash, max_distance):
+            root_a, root_b = find(key), find(other)
+            if root_a != root_b:
+                parent[root_b] = root_a
+
+    groups: Dict[str, List[str]] = {}
+    for key in hashes:
+        groups.setdefault(find(key), []).append(key)
+    return [group for group in groups.values() if len(group) > 1]
@@ -0,0 +1,147 @@
+import os
+import asyncio
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from singleflight import SingleFlight
+
+
+class DiskLRUCache:
+    """
+    Кеш байтов на диске с ограничением общего размера.
+
+    Индекс (ключ -> размер) хранится в памяти в порядке последнего обращения;
+    при превышении max_bytes удаляются самые давно использованные файлы.
+    При старте индекс восстанавливается по файлам в каталоге (порядок - по
+    времени изменения), так что кеш переживает перезапуск сервера.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._flight = SingleFlight()
+        self._load_index()
+
+    def _load_index(self) -> None:
+        if not self.root.exists():
+            return
+        entries = []
+        for path in self.root.glob("*/*"):
+            if path.suffix == ".tmp":
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self.total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def _file_name(key: str) -> str:
+        # Ключ может содержать любые символы - на диске используем его хеш
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _path(self, name: str) -> Path:
+        return self.root / name[:2] / name
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Возвращает закешированные байты и отмечает ключ как недавно использованный.
+
+        Args:
+            key: Ключ кеша
+
+        Returns:
+            Байты или None при промахе
+        """
+        name = self._file_name(key)
+        if name not in self._index:
+            return None
+        try:
+            data = await asyncio.to_thread(self._path(name).read_bytes)
+        except FileNotFoundError:
+            # Файл удалили снаружи - забываем о нем
+            self.total_bytes -= self._index.pop(name, 0)
+            return None
+        self._index.move_to_end(name)
+        return data
+
+    async def put(self, key: str, data: bytes) -> None:
+        """
+        Сохраняет байты и вытесняет старые записи при превышении лимита.
+
+        Args:
+            key: Ключ кеша
+            data: Байты для сохранения
+        """
+        if len(data) > self.max_bytes:
+            return
+        name = self._file_name(key)
+        await asyncio.to_thread(self._write_sync, name, data)
+        self.total_bytes -= self._index.pop(name, 0)
+        self._index[name] = len(data)
+        self.total_bytes += len(data)
+        self._evict()
+
+    async def get_or_create(self, key: str, create: Callable[[], Awaitable[bytes]]) -> bytes:
+        """
+        Возвращает байты из кеша, при промахе создает и сохраняет их.
+
+        Одновременные промахи по одному ключу объединяются: create
+        вызывается один раз, остальные запросы ждут его результата.
+
+        Args:
+            key: Ключ кеша
+            create: Асинхронная функция, возвращающая байты
+
+        Returns:
+            Байты для ключа
+        """
+        data = await self.get(key)
+        if data is not None:
+            return data
+
+        async def fill() -> bytes:
+            # Пока ждали своей очереди, значение могли положить в кеш
+            cached = await self.get(key)
+            if cached is not None:
+                return cached
+            created = await create()
+            await self.put(key, created)
+            return created
+
+        return await self._flight.do(key, fill)
+
+    def _write_sync(self, name: str, data: bytes) -> None:
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+    def _evict(self) -> None:
+        while self.total_bytes > self.max_bytes and self._index:
+            name, size = self._index.popitem(last=False)
+            self.total_bytes -= size
+            self._path(name).unlink(missing_ok=True)
+
+
+def create_resize_cache() -> DiskLRUCache:
+    """
+    Создает кеш уменьшенных копий по переменным окружения.
+
+    RESIZE_CACHE_PATH: каталог кеша (по умолчанию ./resize_cache рядом с сервером)
+    RESIZE_CACHE_MAX_MB: лимит размера в МБ (по умолчанию 512)
+
+    Returns:
+        Экземпляр DiskLRUCache
+    """
+    default_path = Path(__file__).parent / "resize_cache"
+    root = os.environ.get("RESIZE_CACHE_PATH", str(default_path))
+    max_mb = int(os.environ.get("RESIZE_CACHE_MAX_MB", "512"))
+    return DiskLRUCache(root, max_mb * 1024 * 1024)
@@ -0,0 +1,239 @@
+import re
+import math
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import snowballstemmer
+except ImportError:  # без snowballstemmer работает упрощенный стеммер ниже
+    snowballstemmer = None
+
+
+# Поля товара и их вес в частоте терма (BM25F: совпадение в названии важнее описания)
+SEARCH_FIELD_WEIGHTS = {"name": 3.0, "category": 2.0, "description": 1.0}
+
+# Параметры BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Окончания для упрощенного стеммера, от длинных к коротким
+_RUSSIAN_ENDINGS = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией", "ость", "ости",
+    "ать", "ять", "ить", "еть", "ешь", "ишь", "ете", "ите", "ует", "уют",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ую", "юю", "ых", "их", "ым", "им",
+    "ах", "ях", "ов", "ев", "ом", "ем", "ам", "ям", "ью", "ия", "ии", "ию", "ут", "ют", "ет", "ит",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+), key=len, reverse=True)
+
+
+def _strip_suffix(word: str, endings, min_stem: int) -> str:
+    for ending in endings:
+        if word.endswith(ending) and len(word) - len(ending) >= min_stem:
+            return word[:-len(ending)]
+    return word
+
+
+if snowballstemmer is not None:
+    _RUSSIAN_STEMMER = snowballstemmer.stemmer("russian")
+    _ENGLISH_STEMMER = snowballstemmer.stemmer("english")
+
+    def _stem_russian(word: str) -> str:
+        return _RUSSIAN_STEMMER.stemWord(word)
+
+    def _stem_english(word: str) -> str:
+        return _ENGLISH_STEMMER.stemWord(word)
+else:
+    def _stem_russian(word: str) -> str:
+        return _strip_suffix(word, _RUSSIAN_ENDINGS, 3)
+
+    def _stem_english(word: str) -> str:
+        # Только множественное число (шаг 1a Портера): phones -> phone, batteries -> battery
+        if word.endswith("ies"):
+            return word[:-3] + "y"
+        if word.endswith("sses"):
+            return word[:-2]
+        if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+            return word[:-1]
+        return word
+
+
+@lru_cache(maxsize=100_000)
+def stem(word: str) -> str:
+    """
+    Приводит слово к основе. Язык определяется по алфавиту слова.
+
+    Args:
+        word: Слово в нижнем регистре
+
+    Returns:
+        Основа слова (числа и короткие слова не меняются)
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+    if _CYRILLIC_RE.search(word):
+        return _stem_russian(word)
+    return _stem_english(word)
+
+
+def split_words(text: Optional[str]) -> List[str]:
+    """
+    Разбивает текст на слова в нижнем регистре (ё приводится к е).
+
+    Args:
+        text: Произвольный текст
+
+    Returns:
+        Список слов в порядке появления
+    """
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower().replace("ё", "е"))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Разбивает текст на основы слов.
+
+    Args:
+        text: Произвольный текст
+
+    Returns:
+        Список основ в порядке появления
+    """
+    return [stem(word) for word in split_words(text)]
+
+
+class SearchIndex:
+    """
+    Инвертированный индекс товаров в памяти с ранжированием BM25.
+
+    Для каждой основы слова хранится список вхождений: номера строк
+    (array('I')) и взвешенные частоты (array('f')). Новые строки всегда
+    дописываются в конец, поэтому списки остаются упорядоченными, а
+    обновление товара - это удаление старой строки и добавление новой.
+    Удаленные строки отбрасываются при запросе по маске и вычищаются
+    пересборкой, когда их становится больше половины.
+
+    Запрос складывает вклады термов через np.bincount, поэтому стоимость
+    пропорциональна длине списков вхождений, а не размеру каталога.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._document_frequency: Dict[str, int] = {}
+        self._terms: List[Optional[Dict[str, float]]] = []
+        self._ids: List[Optional[str]] = []
+        self._lengths = array("f")
+        self._rows: Dict[str, int] = {}
+        self._total_length = 0.0
+        self._dirty = True
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def replace_all(self, docs: List[Dict[str, Any]]) -> None:
+        """
+        Заменяет индекс целиком.
+
+        Args:
+            docs: Документы активных товаров (id и поля SEARCH_FIELD_WEIGHTS)
+        """
+        self.__init__()
+        for doc in docs:
+            self.upsert(doc)
+        self.loaded = True
+
+    def upsert(self, doc: Dict[str, Any]) -> None:
+        """Индексирует товар, заменяя его прежнюю версию."""
+        self.remove(doc["id"])
+        terms: Dict[str, float] = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for term in tokenize(doc.get(field)):
+                terms[term] = terms.get(term, 0.0) + weight
+        self._add_row(doc["id"], terms)
+
+    def remove(self, product_id: str) -> None:
+        """Убирает товар из индекса (удален или больше не активен)."""
+        row = self._rows.pop(product_id, None)
+        if row is None:
+            return
+        for term in self._terms[row]:
+            self._document_frequency[term] -= 1
+        self._total_length -= self._lengths[row]
+        self._terms[row] = None
+        self._ids[row] = None
+        self._dirty = True
+        # Пересобираем, когда удаленных строк стало больше половины
+        if len(self._rows) * 2 < len(self._ids):
+            self._compact()
+
+    def _add_row(self, product_id: str, terms: Dict[str, float]) -> None:
+        row = len(self._ids)
+        self._rows[product_id] = row
+        self._ids.append(product_id)
+        self._terms.append(terms)
+        length = sum(terms.values())
+        self._lengths.append(length)
+        self._total_length += length
+        for term, frequency in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("f"))
+            postings[0].append(row)
+            postings[1].append(frequency)
+            self._document_frequency[term] = self._document_frequency.get(term, 0) + 1
+        self._dirty = True
+
+    def _compact(self) -> None:
+        rows = [(product_id, terms) for product_id, terms in zip(self._ids, self._terms) if terms is not None]
+        self.__init__()
+        for product_id, terms in rows:
+            self._add_row(product_id, terms)
+        self.loaded = True
+
+    def _build(self) -> None:
+        self._alive_mask = np.array([product_id is not None for product_id in self._ids], dtype=bool)
+        self._id_column = np.array([product_id or "" for product_id in self._ids], dtype=str)
+        self._dirty = False
+
+    def search(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Ищет товары, содержащие хотя бы одно слово запроса.
+
+        Args:
+            text: Строка поиска от пользователя
+
+        Returns:
+            Массивы (id товаров, оценки BM25) без определенного порядка
+        """
+        if self._dirty:
+            self._build()
+        count = len(self._rows)
+        terms = [term for term in set(tokenize(text)) if self._document_frequency.get(term)]
+        if not count or not terms:
+            return np.array([], dtype=str), np.array([], dtype=np.float64)
+
+        lengths = np.frombuffer(self._lengths, dtype=np.float32)
+        average_length = self._total_length / count
+        all_rows = []
+        contributions = []
+        for term in terms:
+            rows, frequencies = self._postings[term]
+            rows = np.frombuffer(rows, dtype=np.uint32)
+            frequencies = np.frombuffer(frequencies, dtype=np.float32).astype(np.float64)
+            frequency = self._document_frequency[term]
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[rows] / average_length)
+            all_rows.append(rows)
+            contributions.append(idf * frequencies * (BM25_K1 + 1) / (frequencies + norm))
+        scores = np.bincount(np.concatenate(all_rows), weights=np.concatenate(contributions), minlength=len(self._ids))
+
+        matched = np.flatnonzero((scores > 0) & self._alive_mask)
+        return self._id_column[matched], scores[matched]
@@ -1,19 +1,44 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Header, BackgroundTasks
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Header, BackgroundTasks, Query, Response
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict
+from typing import Any, List, NamedTuple, Optional, Dict, Set
+from collections import OrderedDict
+from urllib.parse import quote
 import uuid
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import httpx
 import json
 from enum import Enum
 import base64
-from image_utils import compress_image, create_thumbnail, get_image_info, validate_image_size
+import hashlib
+from image_utils import (
+    ALTERNATE_FORMATS, IMAGE_MIME_TYPES, IMAGE_VARIANTS, ImagePoolBusyError, ImageTooLargeError, ImageWorkerPool, InvalidImageError,
+    decode_base64_image, fit_size, process_image, resize_image
+)
+from image_store import content_hash, create_image_store, create_staging_store
+from uploads import InvalidUploadError, UploadTooLargeError, receive_image_uploads
+from http_cache import IMMUTABLE_CACHE_CONTROL, RangeNotSatisfiableError, etag_matches, negotiate_media_type, parse_range
+from resize_cache import create_resize_cache
+from perceptual_index import BKTree, find_duplicate_groups
+from catalog_cache import CachedResponse, CatalogCache, serialize_json
+from catalog_engine import CatalogEngine
+from search_index import SearchIndex
+from fuzzy_index import TrigramIndex
+from suggest_index import SuggestIndex, normalize_query
+from singleflight import SingleFlight
+from pagination import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, RELEVANCE_SORT, SORT_FIELDS, InvalidCursorError, apply_cursor, encode_cursor, get_sort_spec,
+    sort_mode
+)
+from text_search import SEARCH_MODE, TEXT_SCORE, is_text_index_missing, regex_search_filter, text_search_filter
+from pymongo.errors import DuplicateKeyError, OperationFailure
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -23,6 +48,46 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
+# Content-addressed storage for image bytes (IMAGE_STORE_BACKEND=gridfs|local)
+image_store = create_image_store(db)
+
+# Originals waiting for background processing (see /api/jobs)
+staging_store = create_staging_store(db)
+
+# Process pool for CPU-bound image compression (configured via IMAGE_WORKERS etc.)
+image_pool = ImageWorkerPool.from_env()
+
+# Size-bounded disk cache for on-demand resizes (RESIZE_CACHE_PATH, RESIZE_CACHE_MAX_MB)
+resize_cache = create_resize_cache()
+
+# Serialized catalog responses, invalidated on every product write (CATALOG_CACHE_MAX_MB, CATALOG_CACHE_TTL)
+catalog_cache = CatalogCache.from_env()
+
+# Identical concurrent catalog reads share one database call; per-endpoint stats at /api/admin/cache/stats
+catalog_flights = {
+    "products": SingleFlight(),
+    "categories": SingleFlight(),
+    "category_stats": SingleFlight(),
+    "product": SingleFlight(),
+}
+
+# Optional in-memory snapshot that answers catalog filters without MongoDB (CATALOG_ENGINE=memory)
+catalog_engine = CatalogEngine() if os.environ.get("CATALOG_ENGINE", "").lower() == "memory" else None
+# In-process BM25 search over the snapshot (SEARCH_MODE=index, needs CATALOG_ENGINE=memory)
+search_index = SearchIndex() if SEARCH_MODE == "index" and catalog_engine is not None else None
+# Typo correction for searches that find nothing (FUZZY_SEARCH=off disables it)
+fuzzy_index = TrigramIndex() if os.environ.get("FUZZY_SEARCH", "trigram").lower() == "trigram" else None
+# Missing text index is reported once; searches keep falling back to regex
+text_index_missing_logged = False
+CATALOG_ENGINE_RELOAD_SECONDS = float(os.environ.get("CATALOG_ENGINE_RELOAD", 300))
+catalog_engine_task: Optional[asyncio.Task] = None
+
+# Search-as-you-type suggestions; popular queries are re-read every SUGGEST_RELOAD seconds
+SUGGEST_RELOAD_SECONDS = float(os.environ.get("SUGGEST_RELOAD", 300))
+suggest_index = SuggestIndex()
+suggest_cache = CatalogCache(max_bytes=8 * 1024 * 1024, ttl=SUGGEST_RELOAD_SECONDS)
+suggest_task: Optional[asyncio.Task] = None
+
 # Create the main app without a prefix
 app = FastAPI()
 
@@ -38,6 +103,12 @@ class ProductStatus(str, Enum):
     ACTIVE = "active"
     INACTIVE = "inactive"
 
+class ImageJobStatus(str, Enum):
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+
 # Models
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -49,12 +120,28 @@ class User(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     profile_picture: Optional[str] = None
 
+class ProductImage(BaseModel):
+    hash: str  # SHA-256 of the uploaded image bytes
+    content_type: str = "image/jpeg"
+    width: int
+    height: int
+    size_bytes: int
+    placeholder: Optional[str] = None  # Tiny LQIP preview as a data URI (< 1KB)
+    phash: Optional[str] = None  # 64-bit perceptual hash (dHash) as hex, for near-duplicate search
+    variants: Dict[str, str] = {}  # Variant name (full/thumbnail/small/medium) -> image store key
+    alternates: Dict[str, Dict[str, str]] = {}  # Variant name -> {"image/webp"|"image/avif": image store key}
+
 class Product(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     name: str
     description: str
     price: float
-    images: List[str] = []  # Base64 encoded images
+    images: List[str] = []  # Legacy base64 encoded images (written before the image store)
+    image_variants: List[Dict[str, str]] = []  # Legacy per-image base64 variants, aligned with images
+    thumbnail: Optional[str] = None  # Legacy base64 thumbnail of the first image
+    image_refs: List[ProductImage] = []  # Images kept in the image store
+    images_status: Optional[ImageJobStatus] = None  # Status of the latest background image job, if any
+    images_job_id: Optional[str] = None  # GET /api/jobs/{images_job_id}
     category: str
     stock: int = 0
     status: ProductStatus = ProductStatus.ACTIVE
@@ -62,6 +149,34 @@ class Product(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+class ProductCard(BaseModel):
+    """Lightweight product view for catalog listings (no embedded image gallery)"""
+    id: str
+    name: str
+    description: str = ""
+    price: float
+    category: str
+    stock: int = 0
+    created_at: Optional[datetime] = None
+    thumbnail: Optional[str] = None  # Legacy base64 thumbnail of the first image
+    image_hash: Optional[str] = None  # First image in the image store
+    thumbnail_url: Optional[str] = None  # GET /api/images/{image_hash}/thumbnail, or /api/products/{id}/thumbnail for legacy images
+    placeholder: Optional[str] = None  # LQIP data URI shown until the thumbnail loads
+
+# Only the fields a catalog card renders; the full `images` array is served by GET /api/products/{id}
+PRODUCT_CARD_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "name": 1,
+    "description": 1,
+    "price": 1,
+    "category": 1,
+    "stock": 1,
+    "created_at": 1,
+    "thumbnail": 1,
+    "image_refs": {"$slice": 1}
+}
+
 class ProductCreate(BaseModel):
     name: str
     description: str
@@ -79,6 +194,28 @@ class ProductUpdate(BaseModel):
     stock: Optional[int] = None
     status: Optional[ProductStatus] = None
 
+class ProductImagesAdd(BaseModel):
+    images: List[str]  # Base64 encoded images
+    position: Optional[int] = Field(None, ge=0)  # Insert before this index (default: append)
+
+class ProductImagesOrder(BaseModel):
+    hashes: List[str]  # All image hashes of the product in the new order
+
+class ImageJob(BaseModel):
+    """Background compression of a product's images"""
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    product_id: str
+    mode: str  # "replace" the gallery or "add" to it
+    position: Optional[int] = None  # Insert position for "add"
+    hashes: List[str]  # SHA-256 of the staged originals, in gallery order
+    status: ImageJobStatus = ImageJobStatus.PENDING
+    total: int
+    processed: int = 0
+    error: Optional[str] = None
+    created_by: str  # Admin user ID
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 class VisitorTrack(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     visitor_id: str
@@ -127,21 +264,34 @@ async def get_current_admin(authorization: str = Header(None)) -> User:
         raise HTTPException(status_code=403, detail="Admin access required")
     return user
 
+def client_ip(request: Request) -> str:
+    """Client IP address, taken from X-Forwarded-For behind a proxy"""
+    if "x-forwarded-for" in request.headers:
+        return request.headers["x-forwarded-for"].split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+# Number of reverse proxies in front of the app that append to X-Forwarded-For (TRUSTED_PROXY_HOPS)
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", 0))
+
+def visitor_ip(request: Request) -> str:
+    """Client IP address that the client cannot choose: the socket peer or the address seen by a trusted proxy"""
+    if TRUSTED_PROXY_HOPS and "x-forwarded-for" in request.headers:
+        # Левые значения может прислать сам клиент; каждый доверенный прокси дописывает адрес справа
+        addresses = [address.strip() for address in request.headers["x-forwarded-for"].split(",")]
+        if len(addresses) >= TRUSTED_PROXY_HOPS:
+            return addresses[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
+
 async def track_visitor(request: Request, background_tasks: BackgroundTasks, page: str, user: Optional[User] = None):
     """Background task to track visitor"""
     visitor_id = str(uuid.uuid4())
     user_agent = request.headers.get("user-agent", "")
     
-    # Get IP address
-    ip_address = request.client.host if request.client else "unknown"
-    if "x-forwarded-for" in request.headers:
-        ip_address = request.headers["x-forwarded-for"].split(",")[0].strip()
-    
     track_data = VisitorTrack(
         visitor_id=visitor_id,
         page=page,
         user_agent=user_agent,
-        ip_address=ip_address,
+        ip_address=client_ip(request),
         user_id=user.id if user else None
     )
     
@@ -248,6 +398,441 @@ async def get_current_user_info(user: User = Depends(get_current_user)):
         raise HTTPException(status_code=401, detail="Not authenticated")
     return user
 
+# Product image helpers
+def image_url(image_hash: str, variant: str) -> str:
+    return f"/api/images/{image_hash}/{variant}"
+
+# Image records are immutable once written, so lookups by hash can be cached in-process
+IMAGE_RECORD_CACHE_SIZE = 10000
+image_record_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+async def get_image_record(image_hash: str) -> Optional[dict]:
+    record = image_record_cache.get(image_hash)
+    if record is not None:
+        image_record_cache.move_to_end(image_hash)
+        return record
+    
+    record = await db.images.find_one({"hash": image_hash}, {"_id": 0})
+    if record is not None:
+        image_record_cache[image_hash] = record
+        if len(image_record_cache) > IMAGE_RECORD_CACHE_SIZE:
+            image_record_cache.popitem(last=False)
+    return record
+
+# BK-tree over perceptual hashes of stored images, loaded on first use and extended on writes
+phash_index: Optional[BKTree] = None
+
+async def get_phash_index() -> BKTree:
+    global phash_index
+    if phash_index is None:
+        records = db.images.find({"phash": {"$ne": None}}, {"_id": 0, "hash": 1, "phash": 1})
+        phash_index = BKTree.from_items([(int(record["phash"], 16), record["hash"]) async for record in records])
+    return phash_index
+
+IMAGE_TOO_LARGE_DETAIL = "Изображение слишком большое. Максимальный размер: 10MB"
+
+async def store_images(image_datas: List[bytes], hashes: List[str]) -> List[ProductImage]:
+    """Compress and save decoded images to the image store, skipping already stored uploads"""
+    # Одинаковые загрузки уже сжаты и лежат в хранилище - берем готовую запись
+    known = {
+        record["hash"]: record
+        async for record in db.images.find({"hash": {"$in": hashes}}, {"_id": 0})
+    }
+    pending = {}
+    for image_hash, image_data in zip(hashes, image_datas):
+        if image_hash not in known:
+            pending[image_hash] = image_data
+    
+    try:
+        results = await image_pool.map(process_image, pending.values())
+    except InvalidImageError:
+        raise HTTPException(status_code=400, detail="Некорректное изображение")
+    except ImagePoolBusyError:
+        raise HTTPException(
+            status_code=503,
+            detail="Сервер обрабатывает слишком много изображений, попробуйте позже",
+            headers={"Retry-After": "5"}
+        )
+    
+    for image_hash, result in zip(pending, results):
+        variants = {}
+        for name, variant_data in result["variants"].items():
+            variants[name] = await image_store.put(variant_data)
+        
+        alternates = {}
+        for name, encoded in result["alternates"].items():
+            alternates[name] = {}
+            for media_type, variant_data in encoded.items():
+                alternates[name][media_type] = await image_store.put(variant_data)
+        
+        record = {
+            "hash": image_hash,
+            "content_type": result["content_type"],
+            "width": result["width"],
+            "height": result["height"],
+            "size_bytes": len(pending[image_hash]),
+            "placeholder": result["placeholder"],
+            "phash": result["phash"],
+            "variants": variants,
+            "alternates": alternates,
+            "created_at": datetime.utcnow()
+        }
+        write = await db.images.update_one({"hash": image_hash}, {"$setOnInsert": record}, upsert=True)
+        known[image_hash] = record
+        if write.upserted_id is not None and phash_index is not None:
+            phash_index.add(int(record["phash"], 16), image_hash)
+    
+    return [ProductImage(**known[image_hash]) for image_hash in hashes]
+
+def decode_product_images(images: List[str]) -> List[bytes]:
+    """Decode base64 product images from a JSON body"""
+    try:
+        return [decode_base64_image(image_b64, max_size_mb=10) for image_b64 in images]
+    except ImageTooLargeError:
+        # Слишком большое изображение - возвращаем ошибку
+        raise HTTPException(status_code=413, detail=IMAGE_TOO_LARGE_DETAIL)
+    except InvalidImageError:
+        raise HTTPException(status_code=400, detail="Некорректное изображение")
+
+async def store_product_images(images: List[str]) -> List[ProductImage]:
+    """Decode base64 product images from a JSON body and save them to the image store"""
+    image_datas = decode_product_images(images)
+    return await store_images(image_datas, [content_hash(image_data) for image_data in image_datas])
+
+async def product_images_update(images: List[str]) -> Dict:
+    """Fields to write when a product's image list is replaced"""
+    return image_refs_update(await store_product_images(images))
+
+def image_refs_update(image_refs: List[ProductImage]) -> Dict:
+    """Fields to write when a product's gallery is replaced with stored images"""
+    return {
+        "image_refs": [image.dict() for image in image_refs],
+        # Старые base64 поля больше не используются для этого товара
+        "images": [],
+        "image_variants": [],
+        "thumbnail": None
+    }
+
+async def add_product_images(product: dict, image_refs: List[ProductImage], position: Optional[int] = None) -> Product:
+    """Insert stored images into a product's gallery, skipping images it already has"""
+    present = {image["hash"] for image in product.get("image_refs") or []}
+    new_refs = []
+    for image in image_refs:
+        if image.hash not in present:
+            present.add(image.hash)
+            new_refs.append(image.dict())
+    
+    push = {"$each": new_refs}
+    if position is not None:
+        push["$position"] = position
+    
+    if new_refs:
+        await db.products.update_one(
+            {"id": product["id"]},
+            {"$push": {"image_refs": push}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        await catalog_changed(product["id"])
+    
+    updated_product = await db.products.find_one({"id": product["id"]})
+    return Product(**updated_product)
+
+# Image jobs: products are written immediately and their images are compressed in the background
+IMAGE_JOB_HEARTBEAT_SECONDS = 30  # A running job refreshes updated_at this often
+IMAGE_JOB_STALE_SECONDS = 120  # A "processing" job without a heartbeat for this long is assumed dead and restarted
+IMAGE_JOB_SWEEP_SECONDS = 60  # How often dead and unclaimed jobs are looked for
+image_job_sweep_task: Optional[asyncio.Task] = None
+
+# Jobs resumed by the sweep run as plain tasks; keep references so they are not garbage collected
+image_job_tasks: set = set()
+
+def staging_key(job_id: str, index: int) -> str:
+    """Staging key of a job's original; per job, so jobs with the same image never share a staged blob"""
+    return f"{job_id}-{index}"
+
+async def start_image_job(
+    product_id: str,
+    image_datas: List[bytes],
+    mode: str,
+    background_tasks: BackgroundTasks,
+    admin: User,
+    position: Optional[int] = None
+) -> ImageJob:
+    """Stage originals and schedule their processing after the response is sent"""
+    hashes = [content_hash(image_data) for image_data in image_datas]
+    job = ImageJob(product_id=product_id, mode=mode, position=position, hashes=hashes, total=len(hashes), created_by=admin.id)
+    for index, image_data in enumerate(image_datas):
+        await staging_store.put_at(staging_key(job.id, index), image_data)
+    await db.image_jobs.insert_one(job.dict())
+    await db.products.update_one(
+        {"id": product_id},
+        {"$set": {"images_status": ImageJobStatus.PENDING, "images_job_id": job.id}}
+    )
+    await catalog_changed(product_id)
+    background_tasks.add_task(run_image_job, job.id)
+    return job
+
+async def run_image_job(job_id: str):
+    """Compress a job's staged originals and attach them to its product"""
+    job = await db.image_jobs.find_one_and_update(
+        {"id": job_id, "status": ImageJobStatus.PENDING},
+        {"$set": {"status": ImageJobStatus.PROCESSING, "updated_at": datetime.utcnow()}},
+        projection={"_id": 0}
+    )
+    if not job:
+        # Задачу уже забрал другой процесс
+        return
+    
+    async def process(index: int, image_hash: str) -> ProductImage:
+        # Уже обработанное изображение не требует исходника
+        record = await db.images.find_one({"hash": image_hash}, {"_id": 0})
+        if record:
+            image_ref = ProductImage(**record)
+        else:
+            image_data = await staging_store.get(staging_key(job_id, index))
+            if image_data is None:
+                raise HTTPException(status_code=410, detail="Staged image is missing")
+            image_ref, = await store_images([image_data], [image_hash])
+        await db.image_jobs.update_one(
+            {"id": job_id},
+            {"$inc": {"processed": 1}, "$set": {"updated_at": datetime.utcnow()}}
+        )
+        return image_ref
+    
+    async def heartbeat():
+        # Живая задача продлевает updated_at, иначе обход сочтет ее процесс мертвым
+        while True:
+            await asyncio.sleep(IMAGE_JOB_HEARTBEAT_SECONDS)
+            await db.image_jobs.update_one(
+                {"id": job_id, "status": ImageJobStatus.PROCESSING},
+                {"$set": {"updated_at": datetime.utcnow()}}
+            )
+    
+    heartbeat_task = asyncio.create_task(heartbeat())
+    try:
+        await db.products.update_one(
+            {"id": job["product_id"], "images_job_id": job_id},
+            {"$set": {"images_status": ImageJobStatus.PROCESSING}}
+        )
+        await catalog_changed(job["product_id"])
+        try:
+            image_refs = await asyncio.gather(*(process(index, image_hash) for index, image_hash in enumerate(job["hashes"])))
+            product = await db.products.find_one({"id": job["product_id"]}, {"_id": 0, "id": 1, "image_refs.hash": 1})
+            if product:
+                if job["mode"] == "add":
+                    await add_product_images(product, image_refs, job["position"])
+                else:
+                    await db.products.update_one(
+                        {"id": job["product_id"]},
+                        {"$set": {**image_refs_update(image_refs), "updated_at": datetime.utcnow()}}
+                    )
+                    await catalog_changed(job["product_id"])
+            status, error = ImageJobStatus.DONE, None
+        except HTTPException as e:
+            status, error = ImageJobStatus.FAILED, e.detail
+        except Exception as e:
+            logger.exception(f"Image job {job_id} failed")
+            status, error = ImageJobStatus.FAILED, str(e)
+    finally:
+        heartbeat_task.cancel()
+    
+    await db.image_jobs.update_one(
+        {"id": job_id},
+        {"$set": {"status": status, "error": error, "updated_at": datetime.utcnow()}}
+    )
+    # Более новая задача того же товара сама выставит свой статус
+    await db.products.update_one(
+        {"id": job["product_id"], "images_job_id": job_id},
+        {"$set": {"images_status": status}}
+    )
+    await catalog_changed(job["product_id"])
+    for index in range(len(job["hashes"])):
+        await staging_store.delete(staging_key(job_id, index))
+
+async def sweep_image_jobs():
+    """Reset jobs whose worker stopped sending heartbeats and run jobs nobody has claimed"""
+    stale_before = datetime.utcnow() - timedelta(seconds=IMAGE_JOB_STALE_SECONDS)
+    await db.image_jobs.update_many(
+        {"status": ImageJobStatus.PROCESSING, "updated_at": {"$lt": stale_before}},
+        {"$set": {"status": ImageJobStatus.PENDING, "processed": 0}}
+    )
+    # Свежие pending-задачи еще может запустить процесс, который их создал
+    async for job in db.image_jobs.find(
+        {"status": ImageJobStatus.PENDING, "updated_at": {"$lt": stale_before}}, {"_id": 0, "id": 1}
+    ):
+        task = asyncio.create_task(run_image_job(job["id"]))
+        image_job_tasks.add(task)
+        task.add_done_callback(image_job_tasks.discard)
+
+async def sweep_image_jobs_periodically():
+    # Задачи процесса, упавшего без перезапуска этого, подбираются без рестарта
+    while True:
+        try:
+            await sweep_image_jobs()
+        except Exception:
+            logger.exception("Image job sweep failed")
+        await asyncio.sleep(IMAGE_JOB_SWEEP_SECONDS)
+
+def legacy_thumbnail_version(product: dict) -> str:
+    """Version of a legacy product's generated thumbnail; changes whenever the product is written"""
+    changed = product.get("updated_at") or product.get("created_at")
+    return changed.strftime("%Y%m%d%H%M%S%f") if changed else "0"
+
+async def product_cards(products: List[dict]) -> List[ProductCard]:
+    """Build listing cards; products written before the image store link to a thumbnail generated from their first image"""
+    for product in products:
+        image_refs = product.get("image_refs") or []
+        product["image_hash"] = image_refs[0]["hash"] if image_refs else None
+        if product["image_hash"]:
+            product["thumbnail_url"] = image_url(product["image_hash"], "thumbnail")
+            product["placeholder"] = image_refs[0].get("placeholder")
+    
+    missing = [product["id"] for product in products if not product.get("thumbnail") and not product["image_hash"]]
+    if missing:
+        # Сами изображения не читаем: миниатюру отдаст GET /api/products/{id}/thumbnail
+        legacy = await db.products.find(
+            {"id": {"$in": missing}, "images.0": {"$exists": True}},
+            {"_id": 0, "id": 1, "updated_at": 1, "created_at": 1}
+        ).to_list(len(missing))
+        versions = {product["id"]: legacy_thumbnail_version(product) for product in legacy}
+        for product in products:
+            if product["id"] in versions:
+                product["thumbnail_url"] = f"/api/products/{product['id']}/thumbnail?v={versions[product['id']]}"
+    
+    return [ProductCard(**product) for product in products]
+
+# Catalog change tracking
+CATALOG_ENGINE_PROJECTION = {**PRODUCT_CARD_PROJECTION, "status": 1}
+
+# Товары, измененные во время перезагрузки снимка: после замены они перечитываются заново
+catalog_reload_pending: Optional[Set[str]] = None
+
+async def catalog_changed(product_id: str):
+    """Invalidate cached catalog responses and refresh the product in the in-memory indexes"""
+    catalog_cache.invalidate()
+    if catalog_reload_pending is not None:
+        catalog_reload_pending.add(product_id)
+    await refresh_catalog_product(product_id)
+    # Снимок мог измениться, пока шел запрос к базе
+    catalog_cache.invalidate()
+
+async def refresh_catalog_product(product_id: str):
+    """Re-read one product and update or drop it in the in-memory indexes"""
+    product = await db.products.find_one({"id": product_id, "status": ProductStatus.ACTIVE}, CATALOG_ENGINE_PROJECTION)
+    card = (await product_cards([product]))[0] if product and catalog_engine is not None else None
+    if product:
+        suggest_index.upsert_product(product)
+    else:
+        suggest_index.remove_product(product_id)
+    suggest_cache.invalidate()
+    if fuzzy_index is not None:
+        if product:
+            fuzzy_index.upsert(product)
+        else:
+            fuzzy_index.remove(product_id)
+    if catalog_engine is not None:
+        if product:
+            catalog_engine.upsert(product, card)
+            if search_index is not None:
+                search_index.upsert(product)
+        else:
+            catalog_engine.remove(product_id)
+            if search_index is not None:
+                search_index.remove(product_id)
+
+# Поля для подсказок и исправления опечаток, когда снимок каталога выключен
+NAME_INDEX_PROJECTION = {"_id": 0, "id": 1, "name": 1, "category": 1}
+
+def build_catalog_indexes(products: List[dict], cards: Optional[List[ProductCard]]):
+    """Build fresh in-memory indexes from a catalog snapshot; runs in a worker thread"""
+    engine = CatalogEngine.from_documents(products, cards) if cards is not None else None
+    search = None
+    if search_index is not None:
+        search = SearchIndex()
+        search.replace_all(products)
+    fuzzy = None
+    if fuzzy_index is not None:
+        fuzzy = TrigramIndex()
+        fuzzy.replace_all(products)
+    suggest = SuggestIndex()
+    suggest.replace_products(products)
+    return engine, search, fuzzy, suggest
+
+async def load_catalog_indexes():
+    """Rebuild the in-memory indexes off the event loop, then swap them in at once.
+
+    With CATALOG_ENGINE=memory that is the catalog snapshot and its search indexes,
+    otherwise just the product names for typo correction and suggestions.
+    """
+    global catalog_engine, search_index, fuzzy_index, suggest_index, catalog_reload_pending
+    catalog_reload_pending = set()
+    try:
+        projection = CATALOG_ENGINE_PROJECTION if catalog_engine is not None else NAME_INDEX_PROJECTION
+        products = await db.products.find({"status": ProductStatus.ACTIVE}, projection).to_list(None)
+        cards = await product_cards(products) if catalog_engine is not None else None
+        engine, search, fuzzy, suggest = await asyncio.to_thread(build_catalog_indexes, products, cards)
+        suggest.copy_queries(suggest_index)
+        catalog_engine, search_index, fuzzy_index, suggest_index = engine, search, fuzzy, suggest
+        pending, catalog_reload_pending = catalog_reload_pending, None
+        # Записи, сделанные во время загрузки, могли не попасть в прочитанный снимок
+        for product_id in pending:
+            await refresh_catalog_product(product_id)
+    finally:
+        catalog_reload_pending = None
+    catalog_cache.invalidate()
+    suggest_cache.invalidate()
+    logger.info(f"Catalog indexes loaded {len(products)} products")
+
+async def reload_catalog_indexes_periodically(interval: float):
+    # Полная перезагрузка подхватывает записи других процессов и скриптов
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await load_catalog_indexes()
+        except Exception:
+            logger.exception("Catalog indexes reload failed")
+
+# Catalog response cache
+# Clients may store catalog responses but must revalidate them with If-None-Match
+CATALOG_CACHE_CONTROL = "no-cache"
+# Corrected search text (percent-encoded UTF-8) when results were found for a corrected query
+DID_YOU_MEAN_HEADER = "X-Did-You-Mean"
+
+class CatalogResult(NamedTuple):
+    """Catalog response data with headers and an empty-result flag that are cached along with it"""
+    data: Any
+    headers: Optional[Dict[str, str]] = None
+    empty: bool = False
+
+async def cached_catalog_response(kind: str, key: tuple, build, if_none_match: Optional[str] = None) -> Response:
+    """Serve pre-serialized JSON for a catalog read, building and caching it on a miss.
+
+    A matching If-None-Match gets 304; on a cache hit that costs neither a database call nor serialization.
+    """
+    return catalog_response(await cached_catalog_entry(kind, key, build), if_none_match)
+
+async def cached_catalog_entry(kind: str, key: tuple, build) -> CachedResponse:
+    """Cached serialized catalog response, built once per key and catalog generation"""
+    cached = catalog_cache.get((kind, *key))
+    if cached is None:
+        generation = catalog_cache.generation
+        
+        async def build_response() -> CachedResponse:
+            data = await build()
+            if not isinstance(data, CatalogResult):
+                data = CatalogResult(data)
+            return catalog_cache.put((kind, *key), serialize_json(data.data), generation, data.headers, data.empty)
+        
+        # Промахи по одному ключу в одном поколении ждут один запрос к базе
+        cached = await catalog_flights[kind].do((generation, *key), build_response)
+    return cached
+
+def catalog_response(cached: CachedResponse, if_none_match: Optional[str] = None) -> Response:
+    """Response (or 304 for a matching If-None-Match) for a cached catalog entry"""
+    headers = {**(cached.headers or {}), "ETag": cached.etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
 # Product endpoints
 @api_router.get("/products")
 async def get_products(
@@ -258,23 +843,115 @@ async def get_products(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     sort_by: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
     user: Optional[User] = Depends(get_current_user)
 ):
-    """Get all active products with advanced filtering"""
+    """Get active products as lightweight cards with advanced filtering.
+
+    When `limit` or `cursor` is given the response is a keyset-paginated page
+    `{"products": [...], "next_cursor": ...}`; otherwise a plain list is returned.
+    A search that finds nothing is retried with misspelled words corrected; such
+    responses carry the corrected query in the `X-Did-You-Mean` header
+    (percent-encoded) and, for pages, in `did_you_mean`.
+    """
     background_tasks.add_task(track_visitor, request, background_tasks, "products", user)
     
+    # Варианты одного запроса ("Phone", " phone", неизвестный sort_by) делят запись кеша
+    query_text = normalize_search(search)
+    sort_by = sort_mode(sort_by)
+    key = (category, query_text, min_price, max_price, sort_by, limit, cursor)
+    cached = await cached_catalog_entry(
+        "products", key, lambda: query_products(category, query_text, min_price, max_price, sort_by, limit, cursor)
+    )
+    
+    # Запросы без результатов (опечатки, мусор) в подсказки не попадают
+    if search and cursor is None and not cached.empty:
+        visitor = user.id if user else visitor_ip(request)
+        background_tasks.add_task(save_search_query, search, visitor)
+    return catalog_response(cached, if_none_match)
+
+def normalize_search(search: Optional[str]) -> Optional[str]:
+    """Canonical search text, so spellings that find the same products share a cache entry"""
+    if not search:
+        return None
+    if SEARCH_MODE == "regex":
+        # Поиск по подстроке учитывает знаки препинания; регистр он и так не различает
+        normalized = " ".join(search.lower().split())
+    else:
+        # Полнотекстовый поиск и BM25 видят только слова - как подсказки
+        normalized = normalize_query(search).strip()
+    return normalized or search
+
+async def query_products(
+    category: Optional[str],
+    search: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    sort_by: Optional[str],
+    limit: Optional[int],
+    cursor: Optional[str]
+):
+    """Run the catalog query behind GET /api/products, retrying misspelled searches.
+
+    The result is marked empty when the search as sent found nothing, even if a correction did.
+    """
+    result = await find_products(category, search, min_price, max_price, sort_by, limit, cursor)
+    if has_products(result):
+        return CatalogResult(result)
+    if not search or fuzzy_index is None or not fuzzy_index.loaded:
+        return CatalogResult(result, empty=True)
+    
+    # Ничего не нашлось - ищем по ближайшим словам из названий товаров
+    corrected = fuzzy_index.correct(search)
+    if corrected is None:
+        return CatalogResult(result, empty=True)
+    corrected_result = await find_products(category, corrected, min_price, max_price, sort_by, limit, cursor)
+    # Исправление, которое тоже ничего не находит, не предлагаем
+    if not has_products(corrected_result):
+        return CatalogResult(result, empty=True)
+    if isinstance(corrected_result, dict):
+        corrected_result["did_you_mean"] = corrected
+    # Список не может нести поле - исправление видно по заголовку
+    return CatalogResult(corrected_result, {DID_YOU_MEAN_HEADER: quote(corrected)}, empty=True)
+
+def has_products(result) -> bool:
+    """Whether a find_products result (page or plain list) is non-empty"""
+    return bool(result["products"] if isinstance(result, dict) else result)
+
+async def find_products(
+    category: Optional[str],
+    search: Optional[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    sort_by: Optional[str],
+    limit: Optional[int],
+    cursor: Optional[str]
+):
+    """Query active products as cards, from the in-memory engine when possible"""
+    global text_index_missing_logged
+    if sort_by == RELEVANCE_SORT and not search:
+        sort_by = None
+    
+    # Поиск в снимке возможен только с поисковым индексом, иначе ищет MongoDB
+    in_memory_search = search_index is not None and search_index.loaded
+    if catalog_engine is not None and (not search or in_memory_search):
+        matches = search_index.search(search) if search else None
+        try:
+            result = catalog_engine.query(
+                category, min_price, max_price, sort_by, limit, cursor, DEFAULT_PAGE_SIZE, matches
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if result is not None:
+            return result
+    
     query = {"status": ProductStatus.ACTIVE}
     
     if category:
         query["category"] = category
     
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"category": {"$regex": search, "$options": "i"}}
-        ]
-    
     # Price filtering
     if min_price is not None or max_price is not None:
         price_filter = {}
@@ -284,107 +961,280 @@ async def get_products(
             price_filter["$lte"] = max_price
         query["price"] = price_filter
     
-    # Get products
-    products_cursor = db.products.find(query)
-    
-    # Apply sorting
-    if sort_by:
-        if sort_by == "price_low":
-            products_cursor = products_cursor.sort("price", 1)
-        elif sort_by == "price_high":
-            products_cursor = products_cursor.sort("price", -1)
-        elif sort_by == "name":
-            products_cursor = products_cursor.sort("name", 1)
-        elif sort_by == "newest":
-            products_cursor = products_cursor.sort("created_at", -1)
-        elif sort_by == "oldest":
-            products_cursor = products_cursor.sort("created_at", 1)
-    
-    products = await products_cursor.to_list(1000)
-    return [Product(**product) for product in products]
+    paginated = limit is not None or cursor is not None
+    
+    if search:
+        text_filter = text_search_filter(search) if SEARCH_MODE != "regex" else None
+        if text_filter:
+            try:
+                return await query_products_text({**query, **text_filter}, sort_by, limit, cursor)
+            except OperationFailure as e:
+                if not is_text_index_missing(e):
+                    raise
+                if not text_index_missing_logged:
+                    text_index_missing_logged = True
+                    logger.warning("Text index on products is missing (run create_indexes.py), using regex search")
+        query["$or"] = regex_search_filter(search)
+    
+    if not paginated:
+        products_cursor = db.products.find(query, PRODUCT_CARD_PROJECTION)
+        if sort_by:
+            products_cursor = products_cursor.sort(get_sort_spec(sort_by))
+        products = await products_cursor.to_list(1000)
+        return await product_cards(products)
+    
+    # Keyset pagination: (sort field, id) strictly after the cursor position
+    if cursor:
+        try:
+            apply_cursor(query, cursor, sort_by)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    page_size = limit or DEFAULT_PAGE_SIZE
+    products = await (
+        db.products.find(query, PRODUCT_CARD_PROJECTION)
+        .sort(get_sort_spec(sort_by))
+        .limit(page_size + 1)
+        .to_list(page_size + 1)
+    )
+    
+    next_cursor = None
+    if len(products) > page_size:
+        products = products[:page_size]
+        next_cursor = encode_cursor(sort_by, products[-1])
+    
+    return {
+        "products": await product_cards(products),
+        "next_cursor": next_cursor
+    }
+
+# Card fields for aggregation pipelines ($project has no find-style $slice projection)
+PRODUCT_CARD_PIPELINE_PROJECTION = {
+    **PRODUCT_CARD_PROJECTION,
+    "image_refs": {"$slice": ["$image_refs", 1]},
+    "score": 1
+}
+
+async def query_products_text(query: dict, sort_by: Optional[str], limit: Optional[int], cursor: Optional[str]):
+    """Full-text search over the products text index, ordered by relevance unless another sort is requested"""
+    if sort_by not in SORT_FIELDS:
+        sort_by = RELEVANCE_SORT
+    paginated = limit is not None or cursor is not None
+    page_size = (limit or DEFAULT_PAGE_SIZE) if paginated else 1000
+    
+    pipeline = [{"$match": query}, {"$addFields": {"score": TEXT_SCORE}}]
+    if cursor:
+        # Условие курсора по score возможно только после $addFields, поэтому поиск идет через aggregate
+        try:
+            pipeline.append({"$match": apply_cursor({}, cursor, sort_by)})
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    pipeline += [
+        {"$sort": dict(get_sort_spec(sort_by))},
+        {"$limit": page_size + 1 if paginated else page_size},
+        {"$project": PRODUCT_CARD_PIPELINE_PROJECTION}
+    ]
+    products = await db.products.aggregate(pipeline).to_list(page_size + 1)
+    
+    if not paginated:
+        return await product_cards(products)
+    
+    next_cursor = None
+    if len(products) > page_size:
+        products = products[:page_size]
+        next_cursor = encode_cursor(sort_by, products[-1])
+    
+    return {
+        "products": await product_cards(products),
+        "next_cursor": next_cursor
+    }
+
+# Delta sync: writes are stamped by each server's clock, so every query looks back this far
+# to catch writes that committed after a client's previous sync but carry an earlier updated_at
+CHANGES_CLOCK_SKEW = timedelta(seconds=5)
+# Deletion log entries expire after this long (TTL index in create_indexes.py)
+DELETION_LOG_RETENTION = timedelta(days=30)
+MAX_CHANGES_PAGE_SIZE = 1000
+
+def changes_token(moment: datetime) -> str:
+    return str(int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000))
+
+def parse_changes_token(token: str) -> datetime:
+    try:
+        return datetime.utcfromtimestamp(int(token) / 1000)
+    except (ValueError, OverflowError, OSError):
+        raise HTTPException(status_code=400, detail="Invalid since token")
+
+@api_router.get("/products/changes")
+async def get_product_changes(
+    since: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=MAX_CHANGES_PAGE_SIZE)
+):
+    """Products created, updated or removed since a sync token.
+
+    Call without `since` to get a starting token, then load the catalog and poll with `since=<next>`.
+    `deleted` lists ids to drop (deleted or deactivated products); items may repeat across polls.
+    When `has_more` is true, call again right away with the returned token.
+    """
+    now = datetime.utcnow()
+    if since is None:
+        return {"changed": [], "deleted": [], "next": changes_token(now), "has_more": False}
+    
+    since_time = parse_changes_token(since)
+    if now - since_time > DELETION_LOG_RETENTION:
+        raise HTTPException(status_code=410, detail="Sync token expired, reload the catalog")
+    
+    window_start = since_time - CHANGES_CLOCK_SKEW
+    products = await (
+        db.products.find(
+            {"updated_at": {"$gte": window_start}},
+            {**PRODUCT_CARD_PROJECTION, "status": 1, "updated_at": 1}
+        )
+        .sort([("updated_at", 1), ("id", 1)])
+        .limit(limit + 1)
+        .to_list(limit + 1)
+    )
+    
+    has_more = len(products) > limit
+    if has_more:
+        products = products[:limit]
+        # Следующая страница начинается с последнего updated_at: повторы допустимы, пропуски - нет
+        window_end = products[-1]["updated_at"]
+        if window_end <= window_start:
+            raise HTTPException(status_code=400, detail="Too many changes in one instant, increase limit")
+    else:
+        window_end = now
+    
+    deletions = await db.product_deletions.find(
+        {"deleted_at": {"$gte": window_start, "$lte": window_end}},
+        {"_id": 0, "id": 1}
+    ).to_list(None)
+    
+    active = [product for product in products if product.get("status") == ProductStatus.ACTIVE]
+    deleted = [product["id"] for product in products if product.get("status") != ProductStatus.ACTIVE]
+    deleted += [deletion["id"] for deletion in deletions]
+    
+    return {
+        "changed": await product_cards(active),
+        "deleted": deleted,
+        # Токен сдвигаем вперед на запас, чтобы следующий запрос снова захватил окно расхождения часов
+        "next": changes_token(window_end + CHANGES_CLOCK_SKEW if has_more else window_end),
+        "has_more": has_more
+    }
 
 @api_router.get("/products/{product_id}")
 async def get_product(
     product_id: str,
     request: Request,
     background_tasks: BackgroundTasks,
+    if_none_match: Optional[str] = Header(None),
     user: Optional[User] = Depends(get_current_user)
 ):
     """Get product by ID"""
     background_tasks.add_task(track_visitor, request, background_tasks, f"product/{product_id}", user)
     
+    return await cached_catalog_response("product", (product_id,), lambda: query_product(product_id), if_none_match)
+
+async def query_product(product_id: str) -> Product:
     product = await db.products.find_one({"id": product_id})
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
     
     return Product(**product)
 
+@api_router.get("/products/{product_id}/thumbnail")
+async def get_legacy_thumbnail(
+    product_id: str,
+    v: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None)
+):
+    """Thumbnail of the first base64 image of a product written before the image store, rendered once and cached on disk"""
+    product = await db.products.find_one(
+        {"id": product_id, "images.0": {"$exists": True}},
+        {"_id": 0, "updated_at": 1, "created_at": 1}
+    )
+    if not product:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    version = legacy_thumbnail_version(product)
+    etag = f'"{product_id}-{version}"'
+    # Ссылка из карточки содержит версию товара, поэтому ответ по ней не меняется
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL if v == version else "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    async def render() -> bytes:
+        legacy = await db.products.find_one({"id": product_id}, {"_id": 0, "images": {"$slice": 1}})
+        if not legacy or not legacy.get("images"):
+            raise HTTPException(status_code=404, detail="Image not found")
+        try:
+            source = decode_base64_image(legacy["images"][0])
+            return await image_pool.submit(resize_image, source, IMAGE_VARIANTS["thumbnail"]["max_size"], "JPEG")
+        except (InvalidImageError, ImageTooLargeError):
+            raise HTTPException(status_code=404, detail="Image not found")
+        except ImagePoolBusyError:
+            raise HTTPException(status_code=503, detail="Image processing is busy, try again later", headers={"Retry-After": "5"})
+    
+    data = await resize_cache.get_or_create(f"legacy-thumbnail:{product_id}:{version}", render)
+    return Response(content=data, media_type=IMAGE_MIME_TYPES["JPEG"], headers=headers)
+
 @api_router.post("/products", response_model=Product)
 async def create_product(
     product_data: ProductCreate,
+    background_tasks: BackgroundTasks,
+    async_images: bool = Query(False),
     admin: User = Depends(get_current_admin)
 ):
-    """Create new product (admin only)"""
+    """Create new product (admin only)
+
+    With async_images=true the product is saved right away and its images are processed in a background job.
+    """
     product_dict = product_data.dict()
+    images = product_dict.pop("images")
     
-    # Сжимаем изображения если они есть
-    if product_dict.get("images"):
-        compressed_images = []
-        for image_b64 in product_dict["images"]:
-            if validate_image_size(image_b64, max_size_mb=10):
-                # Сжимаем изображение
-                compressed_image = compress_image(
-                    image_b64, 
-                    quality=85, 
-                    max_size=(1200, 1200)
-                )
-                compressed_images.append(compressed_image)
-            else:
-                # Слишком большое изображение - возвращаем ошибку
-                raise HTTPException(
-                    status_code=413, 
-                    detail="Изображение слишком большое. Максимальный размер: 10MB"
-                )
-        
-        product_dict["images"] = compressed_images
+    if images and async_images:
+        image_datas = decode_product_images(images)
+        product = Product(**product_dict, created_by=admin.id)
+        await db.products.insert_one(product.dict())
+        await catalog_changed(product.id)
+        job = await start_image_job(product.id, image_datas, "replace", background_tasks, admin)
+        return product.copy(update={"images_status": job.status, "images_job_id": job.id})
+    
+    # Сжимаем изображения и сохраняем их в хранилище изображений
+    if images:
+        product_dict.update(await product_images_update(images))
     
     product = Product(**product_dict, created_by=admin.id)
     await db.products.insert_one(product.dict())
+    await catalog_changed(product.id)
     return product
 
 @api_router.put("/products/{product_id}")
 async def update_product(
     product_id: str,
     product_data: ProductUpdate,
+    background_tasks: BackgroundTasks,
+    async_images: bool = Query(False),
     admin: User = Depends(get_current_admin)
 ):
-    """Update product (admin only)"""
+    """Update product (admin only)
+
+    With async_images=true a new image list replaces the gallery when its background job finishes.
+    """
     existing_product = await db.products.find_one({"id": product_id})
     if not existing_product:
         raise HTTPException(status_code=404, detail="Product not found")
     
     update_data = {k: v for k, v in product_data.dict().items() if v is not None}
     
-    # Сжимаем изображения если они обновляются
-    if update_data.get("images"):
-        compressed_images = []
-        for image_b64 in update_data["images"]:
-            if validate_image_size(image_b64, max_size_mb=10):
-                # Сжимаем изображение
-                compressed_image = compress_image(
-                    image_b64, 
-                    quality=85, 
-                    max_size=(1200, 1200)
-                )
-                compressed_images.append(compressed_image)
-            else:
-                # Слишком большое изображение - возвращаем ошибку
-                raise HTTPException(
-                    status_code=413, 
-                    detail="Изображение слишком большое. Максимальный размер: 10MB"
-                )
-        
-        update_data["images"] = compressed_images
+    # Сжимаем изображения и сохраняем их в хранилище если они обновляются
+    image_datas = None
+    if "images" in update_data:
+        images = update_data.pop("images")
+        if async_images:
+            image_datas = decode_product_images(images)
+        else:
+            update_data.update(await product_images_update(images))
     
     update_data["updated_at"] = datetime.utcnow()
     
@@ -392,6 +1242,122 @@ async def update_product(
         {"id": product_id},
         {"$set": update_data}
     )
+    await catalog_changed(product_id)
+    if image_datas is not None:
+        await start_image_job(product_id, image_datas, "replace", background_tasks, admin)
+    
+    updated_product = await db.products.find_one({"id": product_id})
+    return Product(**updated_product)
+
+@api_router.post("/products/{product_id}/images/upload")
+async def upload_product_images(
+    product_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    position: Optional[int] = Query(None, ge=0),
+    async_images: bool = Query(False),
+    admin: User = Depends(get_current_admin)
+):
+    """Add images uploaded as multipart/form-data (field `files`) to a product, optionally at `position` (admin only)"""
+    product = await db.products.find_one({"id": product_id}, {"_id": 0, "id": 1, "image_refs.hash": 1})
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    # Тело читается потоком: файл больше 10MB отклоняется сразу, не дожидаясь конца загрузки
+    try:
+        uploads = await receive_image_uploads(request, field_name="files", max_size_mb=10)
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail=IMAGE_TOO_LARGE_DETAIL)
+    except InvalidUploadError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        if async_images:
+            await start_image_job(product_id, [upload.read() for upload in uploads], "add", background_tasks, admin, position)
+            updated_product = await db.products.find_one({"id": product_id})
+            return Product(**updated_product)
+        
+        image_refs = await store_images(
+            [upload.read() for upload in uploads],
+            [upload.sha256 for upload in uploads]
+        )
+    finally:
+        for upload in uploads:
+            upload.close()
+    
+    return await add_product_images(product, image_refs, position)
+
+@api_router.post("/products/{product_id}/images")
+async def add_images(
+    product_id: str,
+    images_data: ProductImagesAdd,
+    background_tasks: BackgroundTasks,
+    async_images: bool = Query(False),
+    admin: User = Depends(get_current_admin)
+):
+    """Add base64 images to a product without resending its existing gallery (admin only)"""
+    product = await db.products.find_one({"id": product_id}, {"_id": 0, "id": 1, "image_refs.hash": 1})
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    if async_images:
+        image_datas = decode_product_images(images_data.images)
+        await start_image_job(product_id, image_datas, "add", background_tasks, admin, images_data.position)
+        updated_product = await db.products.find_one({"id": product_id})
+        return Product(**updated_product)
+    
+    image_refs = await store_product_images(images_data.images)
+    return await add_product_images(product, image_refs, images_data.position)
+
+@api_router.delete("/products/{product_id}/images/{image_hash}")
+async def remove_image(
+    product_id: str,
+    image_hash: str,
+    admin: User = Depends(get_current_admin)
+):
+    """Remove one image from a product's gallery (admin only)"""
+    result = await db.products.update_one(
+        {"id": product_id, "image_refs.hash": image_hash},
+        {"$pull": {"image_refs": {"hash": image_hash}}, "$set": {"updated_at": datetime.utcnow()}}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Image not found")
+    await catalog_changed(product_id)
+    
+    # Байты остаются в хранилище: то же изображение может использоваться другими товарами
+    updated_product = await db.products.find_one({"id": product_id})
+    return Product(**updated_product)
+
+@api_router.put("/products/{product_id}/images/order")
+async def reorder_images(
+    product_id: str,
+    order: ProductImagesOrder,
+    admin: User = Depends(get_current_admin)
+):
+    """Reorder a product's gallery; the first image becomes the catalog thumbnail (admin only)"""
+    product = await db.products.find_one({"id": product_id}, {"_id": 0, "image_refs": 1})
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    
+    image_refs = {image["hash"]: image for image in product.get("image_refs") or []}
+    if len(order.hashes) != len(image_refs) or set(order.hashes) != set(image_refs):
+        raise HTTPException(status_code=400, detail="hashes must list every product image exactly once")
+    if not image_refs:
+        # Пустую галерею переставлять нечего ($all с пустым списком ничего не находит)
+        updated_product = await db.products.find_one({"id": product_id})
+        return Product(**updated_product)
+    
+    # Условие на текущий порядок защищает от одновременного добавления или удаления
+    result = await db.products.update_one(
+        {"id": product_id, "image_refs.hash": {"$all": list(image_refs)}, "image_refs": {"$size": len(image_refs)}},
+        {"$set": {
+            "image_refs": [image_refs[image_hash] for image_hash in order.hashes],
+            "updated_at": datetime.utcnow()
+        }}
+    )
+    if result.matched_count == 0:
+        raise HTTPException(status_code=409, detail="Product images changed, reload and retry")
+    await catalog_changed(product_id)
     
     updated_product = await db.products.find_one({"id": product_id})
     return Product(**updated_product)
@@ -405,19 +1371,288 @@ async def delete_product(
     result = await db.products.delete_one({"id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    # Надгробие для /api/products/changes
+    await db.product_deletions.insert_one({"id": product_id, "deleted_at": datetime.utcnow()})
+    await catalog_changed(product_id)
     
     return {"message": "Product deleted successfully"}
 
+# Image endpoints
+@api_router.get("/images/{image_hash}/{variant}")
+async def get_image(
+    image_hash: str,
+    variant: str,
+    range_header: Optional[str] = Header(None, alias="range"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None)
+):
+    """Serve image bytes from the image store with immutable caching, ETag and Range support.
+
+    WebP/AVIF versions are picked by the Accept header when they were generated for the image.
+    """
+    record = await get_image_record(image_hash)
+    if not record or variant not in record["variants"]:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    # Форматы в порядке предпочтения: AVIF меньше WebP, WebP меньше JPEG
+    alternates = record.get("alternates", {}).get(variant, {})
+    keys = {record["content_type"]: record["variants"][variant], **alternates}
+    available = [media_type for media_type in ("image/avif", "image/webp") if media_type in keys]
+    media_type = negotiate_media_type(accept, available, default=record["content_type"])
+    
+    key = keys[media_type]
+    etag = f'"{key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept"
+    }
+    
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    size = await image_store.size(key)
+    if size is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    # If-Range с другим ETag означает, что у клиента устаревшая копия - отдаем целиком
+    byte_range = None
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiableError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    
+    start, end = byte_range if byte_range else (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    status_code = 200
+    if byte_range:
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    
+    return StreamingResponse(
+        image_store.iter_range(key, start, end),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers
+    )
+
+# Largest box a client may request from the resize endpoint
+RESIZE_MAX_DIMENSION = 2400
+
+@api_router.get("/images/{image_hash}")
+async def get_resized_image(
+    image_hash: str,
+    w: Optional[int] = Query(None, ge=1, le=RESIZE_MAX_DIMENSION),
+    h: Optional[int] = Query(None, ge=1, le=RESIZE_MAX_DIMENSION),
+    fmt: Optional[str] = Query(None, pattern="^(jpeg|webp|avif)$"),
+    accept: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Serve the image resized to fit w x h, rendered from the stored full variant and cached on disk.
+
+    Without fmt the format is picked by the Accept header.
+    """
+    if w is None and h is None:
+        raise HTTPException(status_code=400, detail="w or h is required")
+    
+    record = await get_image_record(image_hash)
+    if not record or "full" not in record["variants"]:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    formats = ["JPEG"] + ALTERNATE_FORMATS
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if fmt:
+        format = fmt.upper()
+        if format not in formats:
+            raise HTTPException(status_code=400, detail=f"Format {fmt} is not supported")
+    else:
+        available = [IMAGE_MIME_TYPES[name] for name in ("AVIF", "WEBP") if name in formats]
+        media_type = negotiate_media_type(accept, available, default=IMAGE_MIME_TYPES["JPEG"])
+        format = next(name for name in formats if IMAGE_MIME_TYPES[name] == media_type)
+        headers["Vary"] = "Accept"
+    
+    # Ключ кеша - фактический размер результата: разные w/h, дающие ту же картинку
+    # (в том числе больше исходника - увеличения нет), попадают в одну запись
+    width, height = fit_size(
+        (record["width"], record["height"]),
+        (w or RESIZE_MAX_DIMENSION, h or RESIZE_MAX_DIMENSION)
+    )
+    cache_key = f"{image_hash}:{width}x{height}:{format}"
+    etag = f'"{image_hash}-{width}x{height}-{format.lower()}"'
+    headers["ETag"] = etag
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    
+    async def render() -> bytes:
+        source = await image_store.get(record["variants"]["full"])
+        if source is None:
+            raise HTTPException(status_code=404, detail="Image not found")
+        try:
+            return await image_pool.submit(resize_image, source, (width, height), format)
+        except ImagePoolBusyError:
+            raise HTTPException(status_code=503, detail="Image processing is busy, try again later", headers={"Retry-After": "5"})
+    
+    data = await resize_cache.get_or_create(cache_key, render)
+    return Response(content=data, media_type=IMAGE_MIME_TYPES[format], headers=headers)
+
+# Job endpoints
+@api_router.get("/jobs/{job_id}", response_model=ImageJob)
+async def get_job(job_id: str, admin: User = Depends(get_current_admin)):
+    """Get background image job progress (admin only)"""
+    job = await db.image_jobs.find_one({"id": job_id}, {"_id": 0})
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return ImageJob(**job)
+
+# Search suggestions
+SUGGEST_DEFAULT_LIMIT = 8
+SUGGEST_MAX_LIMIT = 10
+SUGGEST_MAX_BYTES = 1024
+# Подсказки одинаковы для всех пользователей - браузер и CDN могут держать их минуту
+SUGGEST_CACHE_CONTROL = "public, max-age=60"
+# Запрос попадает в подсказки, когда его искали хотя бы столько разных посетителей
+SUGGEST_MIN_QUERY_VISITORS = 3
+SUGGEST_MAX_QUERIES = 5000
+MAX_TRACKED_QUERY_LENGTH = 100
+
+class SearchQueryStatus(str, Enum):
+    APPROVED = "approved"  # Shown even with words that no product has
+    BLOCKED = "blocked"  # Never shown
+
+class SearchQueryModeration(BaseModel):
+    status: SearchQueryStatus
+
+def visitor_key(visitor: str) -> str:
+    # В базе хранится не IP, а его хеш - его достаточно, чтобы считать разных посетителей
+    return hashlib.blake2b(visitor.encode("utf-8"), digest_size=12).hexdigest()
+
+async def save_search_query(search: str, visitor: str):
+    """Count a distinct visitor of a catalog search that found products, for popular query suggestions"""
+    normalized = normalize_query(search).strip()
+    if not normalized or len(normalized) > MAX_TRACKED_QUERY_LENGTH:
+        return
+    try:
+        try:
+            # Отметки удаляет TTL индекс по searched_at (create_indexes.py)
+            await db.search_query_visitors.insert_one(
+                {"_id": f"{normalized}\n{visitor_key(visitor)}", "searched_at": datetime.utcnow()}
+            )
+        except DuplicateKeyError:
+            # Повторные поиски одного посетителя не повышают запрос
+            return
+        await db.search_queries.update_one(
+            {"_id": normalized},
+            {"$inc": {"visitors": 1}, "$set": {"query": " ".join(search.split()), "last_searched_at": datetime.utcnow()}},
+            upsert=True
+        )
+    except Exception as e:
+        logging.error(f"Error saving search query: {e}")
+
+async def load_popular_queries():
+    queries = await (
+        db.search_queries.find(
+            {"visitors": {"$gte": SUGGEST_MIN_QUERY_VISITORS}, "status": {"$ne": SearchQueryStatus.BLOCKED}},
+            {"_id": 0, "query": 1, "visitors": 1, "status": 1}
+        )
+        .sort("visitors", -1)
+        .limit(SUGGEST_MAX_QUERIES)
+        .to_list(SUGGEST_MAX_QUERIES)
+    )
+    # Без одобрения администратора показываются только запросы из слов каталога
+    suggest_index.replace_queries([
+        (query["query"], query["visitors"]) for query in queries
+        if query.get("status") == SearchQueryStatus.APPROVED or suggest_index.is_known(query["query"])
+    ])
+    suggest_cache.invalidate()
+
+async def reload_popular_queries_periodically():
+    while True:
+        await asyncio.sleep(SUGGEST_RELOAD_SECONDS)
+        try:
+            await load_popular_queries()
+        except Exception:
+            logger.exception("Popular search queries reload failed")
+
+def suggestions_body(suggestions: list) -> bytes:
+    # Ответ не больше SUGGEST_MAX_BYTES: лишние подсказки отбрасываются с конца
+    body = serialize_json({"suggestions": suggestions})
+    while len(body) > SUGGEST_MAX_BYTES:
+        suggestions = suggestions[:-1]
+        body = serialize_json({"suggestions": suggestions})
+    return body
+
+@api_router.get("/search/suggest")
+async def suggest_search(
+    q: str = Query(..., max_length=MAX_TRACKED_QUERY_LENGTH),
+    limit: int = Query(SUGGEST_DEFAULT_LIMIT, ge=1, le=SUGGEST_MAX_LIMIT),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Autocomplete for the search box: popular queries, categories and product names matching the typed prefix.
+
+    Matches start at any of the first words of a suggestion; results are ordered by popularity.
+    """
+    prefix = normalize_query(q)
+    cached = suggest_cache.get((prefix, limit))
+    if cached is None:
+        cached = suggest_cache.put((prefix, limit), suggestions_body(suggest_index.lookup(prefix, limit)))
+    
+    headers = {"ETag": cached.etag, "Cache-Control": SUGGEST_CACHE_CONTROL}
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@api_router.get("/admin/search-queries")
+async def get_search_queries(
+    status: Optional[str] = Query(None, description="approved, blocked or pending"),
+    limit: int = Query(100, ge=1, le=1000),
+    admin: User = Depends(get_current_admin)
+):
+    """Most searched queries with their moderation status, for reviewing suggestions (admin only)"""
+    query = {}
+    if status == "pending":
+        query["status"] = {"$exists": False}
+    elif status:
+        query["status"] = status
+    queries = await db.search_queries.find(query).sort("visitors", -1).to_list(limit)
+    return [
+        {
+            "key": item["_id"],
+            "query": item["query"],
+            "visitors": item.get("visitors", 0),
+            "status": item.get("status", "pending"),
+            "known_words": suggest_index.is_known(item["query"])
+        }
+        for item in queries
+    ]
+
+@api_router.put("/admin/search-queries/{key}")
+async def moderate_search_query(key: str, moderation: SearchQueryModeration, admin: User = Depends(get_current_admin)):
+    """Approve a search query for suggestions or block it (admin only)"""
+    result = await db.search_queries.update_one({"_id": key}, {"$set": {"status": moderation.status}})
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Search query not found")
+    await load_popular_queries()
+    return {"key": key, "status": moderation.status}
+
 # Categories endpoint
 @api_router.get("/categories")
-async def get_categories():
+async def get_categories(if_none_match: Optional[str] = Header(None)):
     """Get all product categories"""
+    return await cached_catalog_response("categories", (), query_categories, if_none_match)
+
+async def query_categories():
     categories = await db.products.distinct("category")
     return {"categories": categories}
 
 @api_router.get("/categories/stats")
-async def get_category_stats():
+async def get_category_stats(if_none_match: Optional[str] = Header(None)):
     """Get category statistics"""
+    return await cached_catalog_response("category_stats", (), query_category_stats, if_none_match)
+
+async def query_category_stats():
     pipeline = [
         {"$match": {"status": ProductStatus.ACTIVE}},
         {"$group": {
@@ -489,6 +1724,84 @@ async def get_all_users(admin: User = Depends(get_current_admin)):
     users = await db.users.find({}).to_list(1000)
     return [User(**user) for user in users]
 
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(admin: User = Depends(get_current_admin)):
+    """Catalog response cache and request coalescing metrics (admin only)"""
+    return {
+        "catalog_cache": catalog_cache.stats(),
+        "suggest_cache": suggest_cache.stats(),
+        "coalescing": {kind: flight.stats() for kind, flight in catalog_flights.items()}
+    }
+
+# Hamming distance up to which two 64-bit dHashes are treated as the same picture
+DUPLICATE_MAX_DISTANCE = 6
+
+async def image_usage(image_hashes: List[str]) -> Dict[str, List[str]]:
+    """Product ids that reference each image"""
+    usage = {image_hash: [] for image_hash in image_hashes}
+    products = db.products.find({"image_refs.hash": {"$in": image_hashes}}, {"_id": 0, "id": 1, "image_refs.hash": 1})
+    async for product in products:
+        for image in product["image_refs"]:
+            if image["hash"] in usage:
+                usage[image["hash"]].append(product["id"])
+    return usage
+
+@api_router.get("/admin/images/duplicates")
+async def get_duplicate_images(
+    max_distance: int = Query(DUPLICATE_MAX_DISTANCE, ge=0, le=16),
+    admin: User = Depends(get_current_admin)
+):
+    """Report groups of perceptually identical images that could be collapsed into one (admin only)"""
+    records = {
+        record["hash"]: record
+        async for record in db.images.find(
+            {"phash": {"$ne": None}},
+            {"_id": 0, "hash": 1, "phash": 1, "width": 1, "height": 1, "size_bytes": 1}
+        )
+    }
+    groups = find_duplicate_groups({image_hash: int(record["phash"], 16) for image_hash, record in records.items()}, max_distance)
+    usage = await image_usage([image_hash for group in groups for image_hash in group])
+    
+    report = []
+    for group in groups:
+        # Оставлять стоит самое крупное изображение группы, остальные - кандидаты на замену
+        images = sorted((records[image_hash] for image_hash in group), key=lambda r: r["width"] * r["height"], reverse=True)
+        report.append({
+            "keep": images[0]["hash"],
+            "images": [
+                {
+                    "hash": image["hash"],
+                    "width": image["width"],
+                    "height": image["height"],
+                    "size_bytes": image["size_bytes"],
+                    "products": usage[image["hash"]]
+                }
+                for image in images
+            ],
+            "duplicate_bytes": sum(image["size_bytes"] for image in images[1:])
+        })
+    
+    report.sort(key=lambda group: group["duplicate_bytes"], reverse=True)
+    return {"groups": report, "total_duplicate_bytes": sum(group["duplicate_bytes"] for group in report)}
+
+@api_router.get("/admin/images/{image_hash}/similar")
+async def get_similar_images(
+    image_hash: str,
+    max_distance: int = Query(DUPLICATE_MAX_DISTANCE, ge=0, le=16),
+    admin: User = Depends(get_current_admin)
+):
+    """Find images that look like the given one (admin only)"""
+    record = await get_image_record(image_hash)
+    if not record:
+        raise HTTPException(status_code=404, detail="Image not found")
+    if not record.get("phash"):
+        return {"similar": []}
+    
+    index = await get_phash_index()
+    matches = [(distance, key) for distance, key in index.search(int(record["phash"], 16), max_distance) if key != image_hash]
+    usage = await image_usage([key for _, key in matches])
+    return {"similar": [{"hash": key, "distance": distance, "products": usage[key]} for distance, key in matches]}
+
 # Health check
 @api_router.get("/health")
 async def health_check():
@@ -503,6 +1816,7 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[DID_YOU_MEAN_HEADER],
 )
 
 # Configure logging
@@ -514,4 +1828,36 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    client.close()
+
+@app.on_event("startup")
+async def start_catalog_engine():
+    """Load the in-memory catalog snapshot (CATALOG_ENGINE=memory) or the product names for search, and keep them fresh"""
+    global catalog_engine_task
+    interval = CATALOG_ENGINE_RELOAD_SECONDS if catalog_engine is not None else SUGGEST_RELOAD_SECONDS
+    try:
+        await load_catalog_indexes()
+    except Exception:
+        # Без индексов каталог и поиск обслуживает MongoDB; их загрузит следующая перезагрузка
+        logger.exception("Catalog indexes load failed")
+    catalog_engine_task = asyncio.create_task(reload_catalog_indexes_periodically(interval))
+
+@app.on_event("startup")
+async def start_suggestions():
+    """Load popular search queries for suggestions and keep them fresh"""
+    global suggest_task
+    try:
+        await load_popular_queries()
+    except Exception:
+        logger.exception("Popular search queries load failed")
+    suggest_task = asyncio.create_task(reload_popular_queries_periodically())
+
+@app.on_event("startup")
+async def resume_image_jobs():
+    """Keep restarting image jobs whose worker died, including jobs interrupted by a server restart"""
+    global image_job_sweep_task
+    image_job_sweep_task = asyncio.create_task(sweep_image_jobs_periodically())
+
+@app.on_event("shutdown")
+async def shutdown_image_pool():
+    image_pool.shutdown()
\ No newline at end of file
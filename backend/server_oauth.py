@@ -10,6 +10,8 @@ from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
 # Импорт OAuth2 системы авторизации
+from pymongo.errors import OperationFailure
+from text_search import SEARCH_MODE, TEXT_SCORE, is_text_index_missing, regex_search_filter, text_search_filter
 from oauth_auth import OAuth2Auth, get_current_user, get_current_active_user, get_admin_user, get_current_user_optional
 
 load_dotenv()
@@ -124,6 +126,23 @@ async def logout():
     return {"message": "Выход выполнен успешно"}
 
 # Публичные маршруты
+async def find_products(query: dict, sort_by: Optional[str], text_score: bool = False) -> list:
+    """Выборка товаров с сортировкой; при полнотекстовом поиске по умолчанию - по релевантности"""
+    products_cursor = db.products.find(query, {"score": TEXT_SCORE} if text_score else None)
+    
+    if sort_by == "price_low":
+        products_cursor = products_cursor.sort("price", 1)
+    elif sort_by == "price_high":
+        products_cursor = products_cursor.sort("price", -1)
+    elif sort_by == "name":
+        products_cursor = products_cursor.sort("name", 1)
+    elif sort_by == "newest":
+        products_cursor = products_cursor.sort("created_at", -1)
+    elif text_score:
+        products_cursor = products_cursor.sort([("score", TEXT_SCORE)])
+    
+    return await products_cursor.to_list(1000)
+
 @app.get("/api/products")
 async def get_products(
     request: Request,
@@ -141,13 +160,6 @@ async def get_products(
     if category:
         query["category"] = category
     
-    if search:
-        query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"category": {"$regex": search, "$options": "i"}}
-        ]
-    
     if min_price is not None or max_price is not None:
         price_filter = {}
         if min_price is not None:
@@ -156,19 +168,18 @@ async def get_products(
             price_filter["$lte"] = max_price
         query["price"] = price_filter
     
-    products_cursor = db.products.find(query)
-    
-    if sort_by:
-        if sort_by == "price_low":
-            products_cursor = products_cursor.sort("price", 1)
-        elif sort_by == "price_high":
-            products_cursor = products_cursor.sort("price", -1)
-        elif sort_by == "name":
-            products_cursor = products_cursor.sort("name", 1)
-        elif sort_by == "newest":
-            products_cursor = products_cursor.sort("created_at", -1)
-    
-    products = await products_cursor.to_list(1000)
+    products = None
+    text_filter = text_search_filter(search) if search and SEARCH_MODE != "regex" else None
+    if text_filter:
+        try:
+            products = await find_products({**query, **text_filter}, sort_by, text_score=True)
+        except OperationFailure as e:
+            if not is_text_index_missing(e):
+                raise
+    if products is None:
+        if search:
+            query["$or"] = regex_search_filter(search)
+        products = await find_products(query, sort_by)
     
     # Конвертируем ObjectId в строку
     for product in products:
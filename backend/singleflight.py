@@ -0,0 +1,62 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых параллельных вызовов.
+
+    Пока вызов с ключом key выполняется, все остальные вызовы с тем же
+    ключом ждут его результата вместо того, чтобы запускать свой.
+    Результат не кешируется: следующий вызов после завершения снова
+    выполнит функцию.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.calls = 0
+        self.executions = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет fn один раз на все одновременные вызовы с этим ключом.
+
+        Args:
+            key: Ключ вызова
+            fn: Асинхронная функция без аргументов
+
+        Returns:
+            Результат fn (общий для всех ожидающих)
+        """
+        self.calls += 1
+        future = self._in_flight.get(key)
+        if future is None:
+            self.executions += 1
+            # Вызов идет в своей задаче: отмена вызвавшего (например, клиент
+            # отключился) не отменяет его и не передается остальным ожидающим
+            future = asyncio.ensure_future(self._run(key, fn))
+            future.add_done_callback(_consume_exception)
+            self._in_flight[key] = future
+        # shield: отмена одного ожидающего не должна отменять общий вызов
+        return await asyncio.shield(future)
+
+    async def _run(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            return await fn()
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        """Число вызовов, реальных выполнений и объединенных вызовов."""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "collapsed": self.calls - self.executions,
+            "in_flight": len(self._in_flight),
+        }
+
+
+def _consume_exception(future: asyncio.Future) -> None:
+    # Если все ожидающие отменены, исключение никто не заберет; не даем asyncio ругаться на "never retrieved"
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,260 @@
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from search_index import split_words
+
+
+# Подсказки по словам внутри текста: "galaxy" находит "Samsung Galaxy S24"
+MAX_WORD_POSITIONS = 3
+
+# Длина ключа в отсортированном массиве; более длинные префиксы проверяются по тексту
+KEY_LENGTH = 32
+
+# Подсказка не длиннее этого числа символов
+MAX_TEXT_LENGTH = 80
+
+# Вес товара; совпадение с середины текста весит вдвое меньше совпадения с начала
+PRODUCT_WEIGHT = 1.0
+INNER_WORD_WEIGHT = 0.5
+
+# Кандидатов из диапазона префикса берется с запасом на повторы
+CANDIDATES_PER_SUGGESTION = 4
+
+_KEY_END = "\U0010ffff"
+
+
+def normalize_query(text: str) -> str:
+    """
+    Нормализует строку поиска: нижний регистр, ё -> е, слова через один пробел.
+
+    Пробел в конце сохраняется - "samsung " ищет только следующее слово.
+
+    Args:
+        text: Строка от пользователя
+
+    Returns:
+        Нормализованная строка (пустая, если слов нет)
+    """
+    normalized = " ".join(split_words(text))
+    if normalized and text[-1:].isspace():
+        normalized += " "
+    return normalized
+
+
+def suggestion_keys(text: str) -> List[str]:
+    """Ключи подсказки: нормализованный текст и его хвосты со 2-го и 3-го слова."""
+    words = split_words(text)
+    return [" ".join(words[position:])[:KEY_LENGTH] for position in range(min(len(words), MAX_WORD_POSITIONS))]
+
+
+def _prefix_range(keys: List[tuple], prefix: str) -> Tuple[int, int]:
+    low = bisect_left(keys, (prefix,))
+    return low, bisect_left(keys, (prefix + _KEY_END,), low)
+
+
+class SuggestIndex:
+    """
+    Подсказки поиска по префиксу: популярные запросы, категории и названия товаров.
+
+    Вместо дерева префиксов - отсортированные массивы ключей: ключи подсказки -
+    ее нормализованный текст и хвосты, начинающиеся со 2-го и 3-го слова.
+    Все ключи с префиксом образуют непрерывный диапазон, который находится
+    двумя бинарными поисками.
+
+    Ключи товаров (их большинство, вес у всех одинаковый) лежат в
+    отсортированных списках и обновляются на месте через bisect. Запросы
+    (вес - сколько раз искали) и категории (вес - число товаров) - небольшой
+    массив с весами в NumPy, лучшие в диапазоне берутся через np.argpartition;
+    он перестраивается лениво после изменений.
+
+    Индекс помнит слова названий и категорий товаров (is_known), чтобы
+    запросы из слов, которых нет в каталоге, не попадали в подсказки без
+    модерации.
+    """
+
+    def __init__(self):
+        self._products: Dict[str, Tuple[str, str]] = {}
+        self._product_starts: List[Tuple[str, str]] = []  # (ключ, id товара) - с начала названия
+        self._product_inner: List[Tuple[str, str]] = []   # (ключ, id товара) - со 2-го и 3-го слова
+        self._category_counts: Dict[str, int] = {}
+        self._vocabulary: Dict[str, int] = {}
+        self._queries: Dict[str, Tuple[str, int]] = {}
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._products) + len(self._queries) + len(self._category_counts)
+
+    def replace_products(self, docs: List[Dict[str, Any]]) -> None:
+        """
+        Заменяет товары целиком.
+
+        Args:
+            docs: Документы активных товаров (нужны id, name, category)
+        """
+        self._products = {}
+        self._product_starts = []
+        self._product_inner = []
+        self._category_counts = {}
+        self._vocabulary = {}
+        for doc in docs:
+            self._products[doc["id"]] = (doc.get("name") or "", doc.get("category") or "")
+        for product_id, (name, category) in self._products.items():
+            keys = suggestion_keys(name)
+            self._product_starts.extend((key, product_id) for key in keys[:1])
+            self._product_inner.extend((key, product_id) for key in keys[1:])
+            self._count_category(category, 1)
+            self._count_words(name, category, 1)
+        self._product_starts.sort()
+        self._product_inner.sort()
+        self._dirty = True
+
+    def upsert_product(self, doc: Dict[str, Any]) -> None:
+        """Добавляет или обновляет активный товар."""
+        self.remove_product(doc["id"])
+        name, category = doc.get("name") or "", doc.get("category") or ""
+        self._products[doc["id"]] = (name, category)
+        keys = suggestion_keys(name)
+        for key in keys[:1]:
+            insort(self._product_starts, (key, doc["id"]))
+        for key in keys[1:]:
+            insort(self._product_inner, (key, doc["id"]))
+        self._count_category(category, 1)
+        self._count_words(name, category, 1)
+
+    def remove_product(self, product_id: str) -> None:
+        """Убирает товар из подсказок."""
+        product = self._products.pop(product_id, None)
+        if product is None:
+            return
+        name, category = product
+        keys = suggestion_keys(name)
+        for key in keys[:1]:
+            self._remove_key(self._product_starts, (key, product_id))
+        for key in keys[1:]:
+            self._remove_key(self._product_inner, (key, product_id))
+        self._count_category(category, -1)
+        self._count_words(name, category, -1)
+
+    @staticmethod
+    def _remove_key(keys: List[Tuple[str, str]], item: Tuple[str, str]) -> None:
+        position = bisect_left(keys, item)
+        if position < len(keys) and keys[position] == item:
+            del keys[position]
+
+    def _count_category(self, category: str, delta: int) -> None:
+        if not category:
+            return
+        count = self._category_counts.get(category, 0) + delta
+        if count > 0:
+            self._category_counts[category] = count
+        else:
+            self._category_counts.pop(category, None)
+        self._dirty = True
+
+    def _count_words(self, name: str, category: str, delta: int) -> None:
+        for word in set(split_words(name)) | set(split_words(category)):
+            count = self._vocabulary.get(word, 0) + delta
+            if count > 0:
+                self._vocabulary[word] = count
+            else:
+                self._vocabulary.pop(word, None)
+
+    def is_known(self, text: str) -> bool:
+        """Проверяет, что каждое слово текста есть в названиях или категориях активных товаров."""
+        words = split_words(text)
+        return bool(words) and all(word in self._vocabulary for word in words)
+
+    def replace_queries(self, queries: List[Tuple[str, int]]) -> None:
+        """
+        Заменяет популярные запросы.
+
+        Args:
+            queries: Пары (текст запроса, сколько раз искали)
+        """
+        self._queries = {}
+        for text, count in queries:
+            key = normalize_query(text).strip()
+            if key and count > self._queries.get(key, ("", 0))[1]:
+                self._queries[key] = (" ".join(text.split()), count)
+        self._dirty = True
+
+    def copy_queries(self, other: "SuggestIndex") -> None:
+        """Берет популярные запросы из другого индекса (при замене индекса новым снимком товаров)."""
+        self._queries = other._queries
+        self._dirty = True
+
+    def _build(self) -> None:
+        # Подсказка: (тип, текст, вес)
+        entries = [("query", text, float(count)) for text, count in self._queries.values()]
+        entries += [("category", category, float(count)) for category, count in self._category_counts.items()]
+
+        keys: List[Tuple[str, int, float]] = []
+        for entry_id, (_, text, weight) in enumerate(entries):
+            for position, key in enumerate(suggestion_keys(text)):
+                keys.append((key, entry_id, weight if position == 0 else weight * INNER_WORD_WEIGHT))
+        keys.sort()
+
+        self._entries = entries
+        self._keys = [(key,) for key, _, _ in keys]
+        self._key_entries = np.array([entry_id for _, entry_id, _ in keys], dtype=np.int64)
+        self._key_weights = np.array([weight for _, _, weight in keys], dtype=np.float64)
+        self._dirty = False
+
+    def lookup(self, prefix: str, limit: int) -> List[Dict[str, Any]]:
+        """
+        Лучшие подсказки для префикса.
+
+        Args:
+            prefix: Нормализованный префикс (normalize_query)
+            limit: Число подсказок
+
+        Returns:
+            Подсказки {"text", "type"} (у товаров еще "id") по убыванию веса
+        """
+        if self._dirty:
+            self._build()
+        if not prefix.strip():
+            return []
+
+        key_prefix = prefix[:KEY_LENGTH]
+        wanted = limit * CANDIDATES_PER_SUGGESTION
+        # Кандидат: (-вес, текст, тип, id товара)
+        candidates: List[Tuple[float, str, str, Optional[str]]] = []
+
+        low, high = _prefix_range(self._keys, key_prefix)
+        weights = self._key_weights[low:high]
+        entry_ids = self._key_entries[low:high]
+        if len(weights) > wanted:
+            top = np.argpartition(-weights, wanted)[:wanted]
+            weights, entry_ids = weights[top], entry_ids[top]
+        for weight, entry_id in zip(weights.tolist(), entry_ids.tolist()):
+            kind, text, _ = self._entries[entry_id]
+            candidates.append((-weight, text, kind, None))
+
+        # У товаров веса равны - достаточно первых ключей диапазона
+        for keys, weight in ((self._product_starts, PRODUCT_WEIGHT), (self._product_inner, PRODUCT_WEIGHT * INNER_WORD_WEIGHT)):
+            low, high = _prefix_range(keys, key_prefix)
+            for _, product_id in keys[low:min(high, low + wanted)]:
+                candidates.append((-weight, self._products[product_id][0], "product", product_id))
+        candidates.sort()
+
+        suggestions = []
+        seen = set()
+        for _, text, kind, product_id in candidates:
+            normalized = " ".join(split_words(text))
+            # Ключи обрезаны до KEY_LENGTH - длинный префикс проверяем по полному тексту
+            if len(prefix) > KEY_LENGTH and " " + prefix not in " " + normalized + " ":
+                continue
+            # Запрос, категория и товар с одинаковым текстом показываются один раз
+            if normalized in seen:
+                continue
+            seen.add(normalized)
+            suggestion = {"text": text[:MAX_TEXT_LENGTH], "type": kind}
+            if product_id is not None:
+                suggestion["id"] = product_id
+            suggestions.append(suggestion)
+            if len(suggestions) == limit:
+                break
+        return suggestions
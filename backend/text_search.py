@@ -0,0 +1,81 @@
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from pymongo.errors import OperationFailure
+
+
+# Режим поиска: text - полнотекстовый индекс MongoDB, regex - старый поиск по подстроке,
+# index - индекс BM25 в памяти процесса (search_index.py, вместе с CATALOG_ENGINE=memory)
+SEARCH_MODE = os.environ.get("SEARCH_MODE", "text").lower()
+
+# Код ошибки MongoDB "text index required for $text query"
+INDEX_NOT_FOUND_CODE = 27
+
+# Веса полей текстового индекса (см. create_indexes.py)
+TEXT_INDEX_WEIGHTS = {"name": 10, "category": 5, "description": 1}
+
+# Символы, которые $search трактует как операторы: фразы в кавычках и исключение через минус
+_TEXT_OPERATOR_RE = re.compile(r'["\\]')
+
+TEXT_SCORE = {"$meta": "textScore"}
+
+
+def text_search_terms(search: str) -> Optional[str]:
+    """
+    Готовит строку для $text: $search без операторов.
+
+    Кавычки и обратные слэши удаляются, ведущий минус у слов отбрасывается,
+    поэтому ввод пользователя всегда означает "любое из слов".
+
+    Args:
+        search: Строка поиска от пользователя
+
+    Returns:
+        Строка для $search или None если слов не осталось
+    """
+    terms = [term.lstrip("-") for term in _TEXT_OPERATOR_RE.sub(" ", search).split()]
+    terms = [term for term in terms if term]
+    return " ".join(terms) if terms else None
+
+
+def text_search_filter(search: str) -> Optional[Dict[str, Any]]:
+    """
+    Фильтр полнотекстового поиска по индексу products.
+
+    Args:
+        search: Строка поиска от пользователя
+
+    Returns:
+        Условие {"$text": ...} или None если искать нечего
+    """
+    terms = text_search_terms(search)
+    if terms is None:
+        return None
+    return {"$text": {"$search": terms}}
+
+
+def regex_search_filter(search: str) -> List[Dict[str, Any]]:
+    """
+    Условия поиска по подстроке для $or (без индекса, полный проход коллекции).
+
+    Ввод экранируется: спецсимволы regex ищутся буквально и не могут
+    вызвать катастрофический бэктрекинг.
+
+    Args:
+        search: Строка поиска от пользователя
+
+    Returns:
+        Список условий по name, description и category
+    """
+    pattern = re.escape(search)
+    return [
+        {"name": {"$regex": pattern, "$options": "i"}},
+        {"description": {"$regex": pattern, "$options": "i"}},
+        {"category": {"$regex": pattern, "$options": "i"}}
+    ]
+
+
+def is_text_index_missing(error: OperationFailure) -> bool:
+    """Ошибка означает, что текстовый индекс еще не создан."""
+    return error.code == INDEX_NOT_FOUND_CODE
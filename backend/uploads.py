@@ -0,0 +1,161 @@
+import hashlib
+from tempfile import SpooledTemporaryFile
+from typing import List, Optional
+
+from starlette.requests import Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+# Файлы меньше этого порога остаются в памяти, большие уходят на диск
+SPOOL_MAX_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Загружаемый файл или запрос превышает допустимый размер."""
+
+
+class InvalidUploadError(ValueError):
+    """Запрос не является корректной multipart загрузкой."""
+
+
+class UploadedImage:
+    """Файл из multipart запроса, сохраненный во временный spooled файл."""
+
+    def __init__(self, filename: Optional[str], content_type: Optional[str]):
+        self.filename = filename
+        self.content_type = content_type
+        self.file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 содержимого, посчитанный по мере получения данных."""
+        return self._hash.hexdigest()
+
+    def write(self, data: bytes) -> None:
+        self.file.write(data)
+        self.size += len(data)
+        self._hash.update(data)
+
+    def read(self) -> bytes:
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self) -> None:
+        self.file.close()
+
+
+async def receive_image_uploads(
+    request: Request,
+    field_name: str = "files",
+    max_size_mb: int = 10,
+    max_files: int = 10
+) -> List[UploadedImage]:
+    """
+    Потоково принимает файлы из multipart/form-data запроса.
+
+    Тело читается по мере поступления и пишется во временные файлы, поэтому
+    в памяти одновременно находится только текущий блок. Файл больше
+    max_size_mb отклоняется, как только пришел лишний байт, а запрос с
+    Content-Length больше допустимого - до чтения тела.
+
+    Args:
+        request: Входящий запрос
+        field_name: Имя поля формы с файлами
+        max_size_mb: Максимальный размер одного файла в МБ
+        max_files: Максимальное число файлов в запросе
+
+    Returns:
+        Список принятых файлов (вызывающий отвечает за close())
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise InvalidUploadError("Expected multipart/form-data")
+
+    max_bytes = max_size_mb * 1024 * 1024
+    # Запас на заголовки частей и разделители
+    max_request_bytes = max_files * max_bytes + 64 * 1024
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_request_bytes:
+        raise UploadTooLargeError("Request body too large")
+
+    uploads: List[UploadedImage] = []
+    current: dict = {"header_field": b"", "header_value": b"", "headers": {}}
+    events: list = []
+
+    def on_part_begin():
+        current["headers"] = {}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        current["header_field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        current["header_value"] += data[start:end]
+
+    def on_header_end():
+        current["headers"][current["header_field"].lower()] = current["header_value"]
+        current["header_field"] = b""
+        current["header_value"] = b""
+
+    def on_headers_finished():
+        events.append(("headers", dict(current["headers"])))
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(("data", data[start:end]))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    upload: Optional[UploadedImage] = None
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event, payload in events:
+                if event == "headers":
+                    _, disposition = parse_options_header(payload.get(b"content-disposition", b""))
+                    name = disposition.get(b"name", b"").decode("utf-8", "replace")
+                    filename = disposition.get(b"filename")
+                    upload = None
+                    if name == field_name and filename is not None:
+                        if len(uploads) >= max_files:
+                            raise UploadTooLargeError(f"More than {max_files} files")
+                        part_type = payload.get(b"content-type")
+                        upload = UploadedImage(
+                            filename.decode("utf-8", "replace"),
+                            part_type.decode("latin-1") if part_type else None
+                        )
+                        uploads.append(upload)
+                elif event == "data" and upload is not None:
+                    if upload.size + len(payload) > max_bytes:
+                        raise UploadTooLargeError(f"File exceeds {max_size_mb}MB")
+                    upload.write(payload)
+                elif event == "end":
+                    upload = None
+            events.clear()
+        parser.finalize()
+    except Exception as e:
+        for uploaded in uploads:
+            uploaded.close()
+        if isinstance(e, (UploadTooLargeError, InvalidUploadError)):
+            raise
+        raise InvalidUploadError(f"Malformed multipart body: {e}")
+
+    if not uploads:
+        raise InvalidUploadError(f"No files in field '{field_name}'")
+    return uploads
@@ -3,12 +3,18 @@
 Скрипт для создания индексов в MongoDB для оптимизации производительности
 """
 import os
+import sys
 import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения
 load_dotenv('backend/.env')
+sys.path.insert(0, 'backend')
+
+from text_search import TEXT_INDEX_WEIGHTS  # noqa: E402
+
+TEXT_INDEX_NAME = "products_text_search"
 
 async def create_indexes():
     """Создает индексы для оптимизации запросов"""
@@ -40,14 +46,56 @@ async def create_indexes():
     await db.products.create_index([("category", 1), ("price", 1)])
     print("✅ Составной индекс по category и price создан")
     
-    # Текстовый индекс для поиска
-    await db.products.create_index([
-        ("name", "text"),
-        ("description", "text"),
-        ("category", "text")
-    ])
+    # Индексы для keyset-пагинации: поле сортировки + id для стабильного порядка
+    await db.products.create_index([("id", 1)], unique=True)
+    print("✅ Уникальный индекс по id создан")
+    
+    for sort_field in ("price", "name", "created_at"):
+        await db.products.create_index([("status", 1), (sort_field, 1), ("id", 1)])
+        await db.products.create_index([("status", 1), ("category", 1), (sort_field, 1), ("id", 1)])
+        print(f"✅ Индексы для пагинации по {sort_field} созданы")
+    
+    # Индекс для дельта-синхронизации (/api/products/changes)
+    await db.products.create_index([("updated_at", 1), ("id", 1)])
+    print("✅ Индекс по updated_at создан")
+    
+    # Журнал удалений для дельта-синхронизации, записи живут 30 дней
+    await db.product_deletions.create_index([("deleted_at", 1)], expireAfterSeconds=30 * 24 * 3600)
+    print("✅ TTL индекс журнала удалений создан")
+    
+    # Текстовый индекс для поиска: у коллекции может быть только один,
+    # поэтому старый индекс с другими весами или именем пересоздаем
+    async for index in db.products.list_indexes():
+        if "textIndexVersion" in index and (
+            index["name"] != TEXT_INDEX_NAME or index.get("weights") != TEXT_INDEX_WEIGHTS
+        ):
+            await db.products.drop_index(index["name"])
+            print(f"♻️ Старый текстовый индекс {index['name']} удален")
+    await db.products.create_index(
+        [(field, "text") for field in TEXT_INDEX_WEIGHTS],
+        weights=TEXT_INDEX_WEIGHTS,
+        default_language="russian",
+        name=TEXT_INDEX_NAME
+    )
     print("✅ Текстовый индекс для поиска создан")
     
+    # Популярные запросы для подсказок поиска (/api/search/suggest)
+    await db.search_queries.create_index([("visitors", -1)])
+    print("✅ Индекс популярных запросов создан")
+    
+    # Отметки "посетитель уже искал запрос" живут 30 дней, потом посетителя можно засчитать снова
+    await db.search_query_visitors.create_index([("searched_at", 1)], expireAfterSeconds=30 * 24 * 3600)
+    print("✅ TTL индекс посетителей запросов создан")
+    
+    # Индексы для коллекции images (записи о сжатых изображениях в хранилище)
+    await db.images.create_index([("hash", 1)], unique=True)
+    print("✅ Уникальный индекс по hash изображения создан")
+    
+    # Индексы для фоновых задач обработки изображений
+    await db.image_jobs.create_index([("id", 1)], unique=True)
+    await db.image_jobs.create_index([("status", 1), ("updated_at", 1)])
+    print("✅ Индексы для image_jobs созданы")
+    
     # Индексы для коллекции users
     await db.users.create_index([("email", 1)], unique=True)
     print("✅ Уникальный индекс по email создан")
@@ -6,6 +6,7 @@ const LazyImage = ({
   alt, 
   className = '', 
   placeholder = null,
+  lqip = null,
   fallback = null,
   onLoad = null,
   onError = null
@@ -38,6 +39,18 @@ const LazyImage = ({
 
   // Placeholder пока изображение загружается
   const renderPlaceholder = () => {
+    // Размытое превью (LQIP), которое сервер кладет прямо в карточку товара
+    if (lqip) {
+      return (
+        <img
+          src={lqip}
+          alt=""
+          aria-hidden="true"
+          className={`${className} filter blur-md`}
+        />
+      );
+    }
+
     if (placeholder) {
       return placeholder;
     }
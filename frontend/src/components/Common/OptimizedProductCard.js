@@ -1,5 +1,5 @@
 import React from 'react';
-import { formatPrice, truncateText } from '../../utils/helpers';
+import { formatPrice, getProductImageSrc, truncateText } from '../../utils/helpers';
 import CartButton from './CartButton';
 import LazyImage from './LazyImage';
 
@@ -25,7 +25,8 @@ const OptimizedProductCard = React.memo(({
       <div className="bg-white rounded-xl shadow-lg overflow-hidden hover:shadow-2xl transition-all duration-300 transform hover:-translate-y-2 h-full group">
         <div className="relative overflow-hidden">
           <LazyImage
-            src={product.images && product.images.length > 0 ? `data:image/jpeg;base64,${product.images[0]}` : null}
+            src={getProductImageSrc(product)}
+            lqip={product.placeholder}
             alt={product.name}
             className="w-full h-72 object-cover transition-transform duration-300 group-hover:scale-110"
             placeholder={
@@ -96,7 +97,8 @@ const OptimizedProductCard = React.memo(({
         <div className="flex p-4 space-x-4">
           <div className="w-24 h-24 flex-shrink-0 overflow-hidden rounded-lg">
             <LazyImage
-              src={product.images && product.images.length > 0 ? `data:image/jpeg;base64,${product.images[0]}` : null}
+              src={getProductImageSrc(product)}
+              lqip={product.placeholder}
               alt={product.name}
               className="w-full h-full object-cover"
               placeholder={
@@ -150,7 +152,8 @@ const OptimizedProductCard = React.memo(({
     <div className="bg-white rounded-lg shadow-sm border border-gray-200 overflow-hidden hover:shadow-md transition-shadow duration-200">
       <div className="relative overflow-hidden">
         <LazyImage
-          src={product.images && product.images.length > 0 ? `data:image/jpeg;base64,${product.images[0]}` : null}
+          src={getProductImageSrc(product)}
+          lqip={product.placeholder}
           alt={product.name}
           className="w-full h-48 object-cover"
           placeholder={
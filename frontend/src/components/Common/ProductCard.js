@@ -1,5 +1,5 @@
 import React from 'react';
-import { formatPrice, truncateText } from '../../utils/helpers';
+import { formatPrice, getProductImageSrc, truncateText } from '../../utils/helpers';
 import CartButton from './CartButton';
 
 const ProductCard = ({ 
@@ -23,9 +23,9 @@ const ProductCard = ({
     return (
       <div className="bg-white rounded-xl shadow-lg overflow-hidden hover:shadow-2xl transition-all duration-300 transform hover:-translate-y-2 h-full group">
         <div className="relative overflow-hidden">
-          {product.images && product.images.length > 0 ? (
+          {getProductImageSrc(product) ? (
             <img 
-              src={`data:image/jpeg;base64,${product.images[0]}`}
+              src={getProductImageSrc(product)}
               alt={product.name}
               className="w-full h-72 object-cover transition-transform duration-300 group-hover:scale-110"
             />
@@ -105,9 +105,9 @@ const ProductCard = ({
     return (
       <div className="bg-gray-50 rounded-xl overflow-hidden shadow-sm hover:shadow-md transition-shadow">
         <div className="flex">
-          {product.images && product.images.length > 0 ? (
+          {getProductImageSrc(product) ? (
             <img 
-              src={`data:image/jpeg;base64,${product.images[0]}`}
+              src={getProductImageSrc(product)}
               alt={product.name}
               className="w-24 h-24 object-cover flex-shrink-0"
             />
@@ -161,9 +161,9 @@ const ProductCard = ({
   // Стандартная версия карточки
   return (
     <div className="bg-white rounded-lg shadow-md overflow-hidden hover:shadow-lg transition-shadow">
-      {product.images && product.images.length > 0 ? (
+      {getProductImageSrc(product) ? (
         <img 
-          src={`data:image/jpeg;base64,${product.images[0]}`}
+          src={getProductImageSrc(product)}
           alt={product.name}
           className="w-full h-48 object-cover"
         />
@@ -1,6 +1,6 @@
 import React from 'react';
 import { useCart } from '../../contexts/CartContext';
-import { formatPrice } from '../../utils/helpers';
+import { formatPrice, getProductImageSrc } from '../../utils/helpers';
 import CartButton from '../Common/CartButton';
 import ContactInfo from '../Common/ContactInfo';
 
@@ -84,9 +84,9 @@ const DesktopCart = () => {
                 {items.map((item) => (
                   <div key={item.id} className="flex items-center space-x-4 p-4 border border-gray-200 rounded-lg">
                     <div className="w-20 h-20 flex-shrink-0 overflow-hidden rounded-lg">
-                      {item.images && item.images.length > 0 ? (
+                      {getProductImageSrc(item) ? (
                         <img 
-                          src={`data:image/jpeg;base64,${item.images[0]}`}
+                          src={getProductImageSrc(item)}
                           alt={item.name}
                           className="w-full h-full object-cover"
                         />
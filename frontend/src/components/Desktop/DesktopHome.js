@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import LazyImage from '../Common/LazyImage';
+import { getProductImageSrc } from '../../utils/helpers';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -325,10 +326,11 @@ const DesktopHome = () => {
                   {featuredProducts.map((product, index) => (
                     <div key={product.id} className="w-1/4 flex-shrink-0 px-3">
                       <div className="bg-white rounded-xl shadow-lg overflow-hidden hover:shadow-2xl transition-all duration-300 transform hover:-translate-y-2 h-full">
-                        {product.images && product.images.length > 0 ? (
+                        {getProductImageSrc(product) ? (
                           <div className="relative overflow-hidden">
                             <LazyImage 
-                              src={`data:image/jpeg;base64,${product.images[0]}`}
+                              src={getProductImageSrc(product)}
+                              lqip={product.placeholder}
                               alt={product.name}
                               className="w-full h-72 object-cover transition-transform duration-300 hover:scale-110"
                               placeholder={
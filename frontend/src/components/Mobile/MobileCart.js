@@ -1,6 +1,6 @@
 import React from 'react';
 import { useCart } from '../../contexts/CartContext';
-import { formatPrice } from '../../utils/helpers';
+import { formatPrice, getProductImageSrc } from '../../utils/helpers';
 import CartButton from '../Common/CartButton';
 import ContactInfo from '../Common/ContactInfo';
 
@@ -79,9 +79,9 @@ const MobileCart = () => {
               <div key={item.id} className="bg-white rounded-lg shadow-sm p-4">
                 <div className="flex items-center space-x-3">
                   <div className="w-16 h-16 flex-shrink-0 overflow-hidden rounded-lg">
-                    {item.images && item.images.length > 0 ? (
+                    {getProductImageSrc(item) ? (
                       <img 
-                        src={`data:image/jpeg;base64,${item.images[0]}`}
+                        src={getProductImageSrc(item)}
                         alt={item.name}
                         className="w-full h-full object-cover"
                       />
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 import LazyImage from '../Common/LazyImage';
+import { getProductImageSrc } from '../../utils/helpers';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -342,9 +343,10 @@ const MobileHome = () => {
               {featuredProducts.map((product) => (
                 <div key={product.id} className="bg-gray-50 rounded-xl overflow-hidden shadow-sm hover:shadow-md transition-shadow">
                   <div className="flex">
-                    {product.images && product.images.length > 0 ? (
+                    {getProductImageSrc(product) ? (
                       <LazyImage 
-                        src={`data:image/jpeg;base64,${product.images[0]}`}
+                        src={getProductImageSrc(product)}
+                        lqip={product.placeholder}
                         alt={product.name}
                         className="w-24 h-24 object-cover flex-shrink-0"
                         placeholder={
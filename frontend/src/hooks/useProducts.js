@@ -8,6 +8,7 @@ export const useProducts = (options = {}) => {
   const [products, setProducts] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
 
   const {
     category = null,
@@ -30,15 +31,17 @@ export const useProducts = (options = {}) => {
       if (minPrice) params.append('min_price', minPrice);
       if (maxPrice) params.append('max_price', maxPrice);
       if (sortBy) params.append('sort_by', sortBy);
+      // Сервер сам отдает только нужную страницу (keyset-пагинация)
+      if (limit) params.append('limit', limit);
 
       const response = await axios.get(`${API}/products?${params}`);
-      let productData = response.data;
 
       if (limit) {
-        productData = productData.slice(0, limit);
+        setProducts(response.data.products);
+        setNextCursor(response.data.next_cursor);
+      } else {
+        setProducts(response.data);
       }
-
-      setProducts(productData);
     } catch (err) {
       setError(err.message);
       console.error('Error fetching products:', err);
@@ -57,12 +60,37 @@ export const useProducts = (options = {}) => {
     fetchProducts();
   }, [fetchProducts]);
 
+  // Загрузка следующей страницы по курсору из предыдущего ответа
+  const fetchMore = useCallback(async () => {
+    if (!limit || !nextCursor) return;
+
+    try {
+      const params = new URLSearchParams();
+      if (category) params.append('category', category);
+      if (search) params.append('search', search);
+      if (minPrice) params.append('min_price', minPrice);
+      if (maxPrice) params.append('max_price', maxPrice);
+      if (sortBy) params.append('sort_by', sortBy);
+      params.append('limit', limit);
+      params.append('cursor', nextCursor);
+
+      const response = await axios.get(`${API}/products?${params}`);
+      setProducts(prev => [...prev, ...response.data.products]);
+      setNextCursor(response.data.next_cursor);
+    } catch (err) {
+      setError(err.message);
+      console.error('Error fetching more products:', err);
+    }
+  }, [category, search, minPrice, maxPrice, sortBy, limit, nextCursor]);
+
   return {
     products,
     loading,
     error,
     refetch,
-    fetchProducts
+    fetchProducts,
+    fetchMore,
+    hasMore: Boolean(nextCursor)
   };
 };
 
@@ -33,6 +33,28 @@ export const formatPrice = (price) => {
   }).format(price);
 };
 
+// Утилита для получения изображения товара: карточки каталога несут ссылку на
+// миниатюру в хранилище изображений, полный товар - image_refs; base64 поля
+// остаются только у товаров, созданных до хранилища
+export const getProductImageSrc = (product, variant = 'thumbnail') => {
+  if (!product) {
+    return null;
+  }
+
+  const backendUrl = process.env.REACT_APP_BACKEND_URL;
+
+  if (variant === 'thumbnail' && product.thumbnail_url) {
+    return `${backendUrl}${product.thumbnail_url}`;
+  }
+
+  if (product.image_refs && product.image_refs.length > 0) {
+    return `${backendUrl}/api/images/${product.image_refs[0].hash}/${variant}`;
+  }
+
+  const image = product.thumbnail || (product.images && product.images[0]);
+  return image ? `data:image/jpeg;base64,${image}` : null;
+};
+
 // Утилита для обрезки текста
 export const truncateText = (text, maxLength) => {
   if (!text || text.length <= maxLength) {
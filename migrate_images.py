@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Скрипт для пересжатия изображений товаров, сохраненных до оптимизации
+
+Проходит по db.products, сжимает base64 изображения через пул процессов
+и записывает результат пачками через bulk_write. По умолчанию изображения
+переносятся в хранилище изображений (image_refs), с --inline остаются
+base64 в документе, но сжатыми и с вариантами.
+
+Прогресс сохраняется в db.migrations после каждой пачки, поэтому
+прерванный запуск продолжается с места остановки. Между пачками скрипт
+делает паузу и замедляется, если растет задержка запросов к базе.
+
+Примеры:
+    python migrate_images.py --dry-run
+    python migrate_images.py --batch-size 10 --workers 2 --max-latency-ms 30
+    python migrate_images.py --inline --reset
+"""
+import sys
+import time
+import base64
+import asyncio
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+# Загружаем переменные окружения и модули сервера
+BACKEND_DIR = Path(__file__).parent / "backend"
+load_dotenv(BACKEND_DIR / '.env')
+sys.path.insert(0, str(BACKEND_DIR))
+
+import server  # noqa: E402
+from image_utils import ImageWorkerPool, process_image  # noqa: E402
+
+MIGRATION_ID = "product_images"
+
+# Предел, до которого растет пауза между пачками при высокой задержке базы
+MAX_PAUSE_SECONDS = 30.0
+
+
+async def probe_latency_ms(db) -> float:
+    """Время типичного запроса каталога - по нему видно, мешает ли миграция"""
+    started = time.perf_counter()
+    await db.products.find_one({"status": "active"}, {"_id": 1})
+    return (time.perf_counter() - started) * 1000
+
+
+async def inline_update(product: dict, image_datas: list) -> dict:
+    """Поля для сжатых base64 изображений в самом документе"""
+    results = await server.image_pool.map(process_image, image_datas)
+    images = []
+    image_variants = []
+    for result in results:
+        encoded = {name: base64.b64encode(data).decode('utf-8') for name, data in result["variants"].items()}
+        images.append(encoded.pop("full"))
+        image_variants.append(encoded)
+    return {
+        "images": images,
+        "image_variants": image_variants,
+        "thumbnail": image_variants[0]["thumbnail"] if image_variants else None
+    }
+
+
+async def store_update(product: dict, image_datas: list) -> dict:
+    """Поля для изображений, перенесенных в хранилище изображений"""
+    hashes = [server.content_hash(image_data) for image_data in image_datas]
+    return server.image_refs_update(await server.store_images(image_datas, hashes))
+
+
+async def migrate_product(product: dict, inline: bool):
+    """Возвращает операцию bulk_write для товара или None если товар пропущен"""
+    try:
+        image_datas = server.decode_product_images(product["images"])
+        fields = await (inline_update if inline else store_update)(product, image_datas)
+    except Exception as e:
+        detail = getattr(e, "detail", None) or str(e)
+        print(f"  ❌ {product['id']}: {detail}")
+        return None
+
+    # Условие на updated_at: если товар изменили во время миграции, его версия не затирается.
+    # Новый updated_at нужен, чтобы товар попал в /api/products/changes и сменил версию миниатюры
+    return UpdateOne(
+        {"_id": product["_id"], "updated_at": product.get("updated_at")},
+        {"$set": {**fields, "updated_at": datetime.utcnow()}}
+    )
+
+
+async def migrate_images(args):
+    """Пересжимает изображения товаров пачками"""
+    db = server.db
+    server.image_pool = ImageWorkerPool(max_workers=args.workers, queue_timeout=600)
+
+    if args.reset:
+        await db.migrations.delete_one({"_id": MIGRATION_ID})
+
+    checkpoint = await db.migrations.find_one({"_id": MIGRATION_ID}) or {}
+    last_id = checkpoint.get("last_id")
+    migrated = checkpoint.get("migrated", 0)
+    skipped = checkpoint.get("skipped", 0)
+
+    # С --inline повторно обрабатываются только товары без вариантов
+    query = {"images.0": {"$exists": True}}
+    if args.inline:
+        query["image_variants.0"] = {"$exists": False}
+
+    total = await db.products.count_documents(query if last_id is None else {**query, "_id": {"$gt": last_id}})
+    print(f"🔧 Миграция изображений: {total} товаров к обработке"
+          f"{' (продолжение)' if last_id is not None else ''}")
+    if args.dry_run:
+        return
+
+    pause = args.pause
+    while True:
+        batch_query = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+        products = await db.products.find(
+            batch_query,
+            {"_id": 1, "id": 1, "images": 1, "updated_at": 1}
+        ).sort("_id", 1).limit(args.batch_size).to_list(args.batch_size)
+        if not products:
+            break
+
+        started = time.perf_counter()
+        operations = await asyncio.gather(*(migrate_product(product, args.inline) for product in products))
+        operations = [operation for operation in operations if operation is not None]
+        if operations:
+            result = await db.products.bulk_write(operations, ordered=False)
+            migrated += result.modified_count
+            skipped += len(products) - result.modified_count
+        else:
+            skipped += len(products)
+
+        last_id = products[-1]["_id"]
+        await db.migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"last_id": last_id, "migrated": migrated, "skipped": skipped}},
+            upsert=True
+        )
+        print(f"✅ Пачка из {len(products)} товаров за {time.perf_counter() - started:.1f}с "
+              f"(всего перенесено {migrated}, пропущено {skipped})")
+
+        # Замедляемся, пока задержка запросов выше порога, и возвращаемся к базовой паузе после
+        latency = await probe_latency_ms(db)
+        if latency > args.max_latency_ms:
+            pause = min(max(pause, 0.5) * 2, MAX_PAUSE_SECONDS)
+            print(f"⏳ Задержка базы {latency:.0f}мс, пауза {pause:.1f}с")
+        else:
+            pause = args.pause
+        await asyncio.sleep(pause)
+
+    print(f"\n🎉 Миграция завершена: перенесено {migrated}, пропущено {skipped}")
+    if skipped:
+        print("📋 Пропущенные товары можно обработать повторно с --reset")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Пересжатие изображений товаров")
+    parser.add_argument("--batch-size", type=int, default=20, help="товаров в одной пачке bulk_write")
+    parser.add_argument("--workers", type=int, default=2, help="процессов для сжатия изображений")
+    parser.add_argument("--pause", type=float, default=0.2, help="пауза между пачками в секундах")
+    parser.add_argument("--max-latency-ms", type=float, default=50.0,
+                        help="задержка запроса к базе, выше которой миграция замедляется")
+    parser.add_argument("--inline", action="store_true",
+                        help="оставить изображения base64 в документе вместо переноса в хранилище")
+    parser.add_argument("--reset", action="store_true", help="начать заново, игнорируя сохраненный прогресс")
+    parser.add_argument("--dry-run", action="store_true", help="только посчитать товары к обработке")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(migrate_images(parse_args()))
+    finally:
+        server.image_pool.shutdown()
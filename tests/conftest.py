@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Модули backend импортируются так же, как их импортирует server.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
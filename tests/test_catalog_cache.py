@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+import catalog_cache
+from catalog_cache import CachedResponse, CatalogCache, serialize_json
+
+
+def test_serialize_json_matches_fastapi_format():
+    body = serialize_json({"name": "Чехол", "created_at": datetime(2025, 1, 2, 3, 4, 5), "items": [1, 2.5]})
+    assert body == '{"name":"Чехол","created_at":"2025-01-02T03:04:05","items":[1,2.5]}'.encode("utf-8")
+
+
+def test_etag_depends_only_on_body():
+    first = CachedResponse.from_body(b"[1]")
+    assert first.etag == CachedResponse.from_body(b"[1]").etag
+    assert first.etag != CachedResponse.from_body(b"[2]").etag
+    assert first.etag.startswith('"') and first.etag.endswith('"')
+
+
+def test_hit_and_miss_counters():
+    cache = CatalogCache(max_bytes=100, ttl=60)
+    assert cache.get("a") is None
+    cache.put("a", b"[1]", headers={"X-Did-You-Mean": "x"})
+    assert cache.get("a").body == b"[1]"
+    assert cache.get("a").headers == {"X-Did-You-Mean": "x"}
+    assert not cache.get("a").empty
+    cache.put("b", b"[]", empty=True)
+    assert cache.get("b").empty
+    assert cache.stats()["hits"] == 4
+    assert cache.stats()["misses"] == 1
+
+
+def test_invalidate_starts_new_generation():
+    cache = CatalogCache(max_bytes=100, ttl=60)
+    cache.put("a", b"[1]")
+    cache.invalidate()
+    assert cache.get("a") is None
+    assert cache.stats()["generation"] == 1
+    assert cache.total_bytes == 0
+
+
+def test_response_built_in_old_generation_is_not_cached():
+    cache = CatalogCache(max_bytes=100, ttl=60)
+    generation = cache.generation
+    cache.invalidate()
+    # Каталог изменился, пока строился ответ - ETag есть, в кеш не попадает
+    response = cache.put("a", b"[1]", generation)
+    assert response.etag
+    assert cache.get("a") is None
+
+
+def test_lru_eviction_by_size():
+    cache = CatalogCache(max_bytes=10, ttl=60)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.get("a")
+    cache.put("c", b"cccc")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.total_bytes == 8
+
+
+def test_oversized_body_is_not_cached():
+    cache = CatalogCache(max_bytes=3, ttl=60)
+    cache.put("a", b"aaaa")
+    assert cache.get("a") is None
+    assert cache.total_bytes == 0
+
+
+def test_replacing_key_keeps_size_accounting():
+    cache = CatalogCache(max_bytes=100, ttl=60)
+    cache.put("a", b"aaaa")
+    cache.put("a", b"aa")
+    assert cache.total_bytes == 2
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(catalog_cache.time, "monotonic", lambda: now[0])
+    cache = CatalogCache(max_bytes=100, ttl=60)
+    cache.put("a", b"[1]")
+    now[0] += 59
+    assert cache.get("a") is not None
+    now[0] += 2
+    assert cache.get("a") is None
+    assert cache.total_bytes == 0
@@ -0,0 +1,158 @@
+import base64
+import json
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from catalog_engine import CatalogEngine
+from pagination import InvalidCursorError, RELEVANCE_SORT, apply_cursor, encode_cursor, get_sort_spec
+
+mongomock = pytest.importorskip("mongomock")
+
+SORT_MODES = [None, "price_low", "price_high", "name", "newest", "oldest", "bogus"]
+PAGE_SIZE = 7
+
+
+def raw_cursor(sort_by, keys):
+    raw = json.dumps({"s": sort_by, "k": keys}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def make_products(count, seed=1):
+    rnd = random.Random(seed)
+    base = datetime(2025, 1, 1)
+    return [
+        {
+            "id": f"id{rnd.randrange(10 ** 6):06d}-{i}",
+            # Повторы цен, имен и дат проверяют разрешение равенств по id
+            "name": rnd.choice(["Альфа", "Бета", "apple", "Zeta", "ёж", "Яблоко"]) + str(rnd.randrange(3)),
+            "price": rnd.choice([5, 10.0, 20.5, 99.99]),
+            "category": rnd.choice(["a", "b", "c"]),
+            "created_at": base + timedelta(seconds=rnd.randrange(30)),
+        }
+        for i in range(count)
+    ]
+
+
+def load_engine(products):
+    return CatalogEngine.from_documents(products, [product["id"] for product in products])
+
+
+def load_collection(products):
+    collection = mongomock.MongoClient().db.products
+    collection.insert_many([dict(product) for product in products])
+    return collection
+
+
+def mongo_page(collection, category, sort_by, cursor):
+    # Тот же запрос, что строит server.find_products для MongoDB
+    query = {"category": category} if category else {}
+    if cursor:
+        query = apply_cursor(query, cursor, sort_by)
+    docs = list(collection.find(query, {"_id": 0}).sort(get_sort_spec(sort_by)).limit(PAGE_SIZE + 1))
+    next_cursor = encode_cursor(sort_by, docs[PAGE_SIZE - 1]) if len(docs) > PAGE_SIZE else None
+    return {"products": [doc["id"] for doc in docs[:PAGE_SIZE]], "next_cursor": next_cursor}
+
+
+def walk(fetch):
+    pages = [fetch(None)]
+    while pages[-1]["next_cursor"]:
+        pages.append(fetch(pages[-1]["next_cursor"]))
+    return pages
+
+
+@pytest.fixture(scope="module")
+def products():
+    return make_products(60)
+
+
+@pytest.mark.parametrize("category", [None, "a", "missing"])
+@pytest.mark.parametrize("sort_by", SORT_MODES)
+def test_pages_match_mongo(products, sort_by, category):
+    engine = load_engine(products)
+    collection = load_collection(products)
+    expected = walk(lambda cursor: mongo_page(collection, category, sort_by, cursor))
+    actual = walk(lambda cursor: engine.query(category, None, None, sort_by, PAGE_SIZE, cursor, PAGE_SIZE))
+    assert actual == expected
+
+
+def test_unpaginated_keeps_insertion_order(products):
+    engine = load_engine(products)
+    assert engine.query("b", None, None, None, None, None, PAGE_SIZE) == [
+        product["id"] for product in products if product["category"] == "b"
+    ]
+
+
+def test_price_range(products):
+    engine = load_engine(products)
+    result = engine.query(None, 10, 20.5, "price_low", None, None, PAGE_SIZE)
+    assert result == [
+        product["id"] for product in sorted(products, key=lambda product: (product["price"], product["id"]))
+        if 10 <= product["price"] <= 20.5
+    ]
+
+
+@pytest.mark.parametrize("sort_by", SORT_MODES)
+def test_incremental_updates_match_rebuild(products, sort_by):
+    engine = load_engine(products)
+    current = {product["id"]: product for product in products}
+    rnd = random.Random(7)
+    for product in make_products(20, seed=2):
+        engine.upsert(product, product["id"])
+        current[product["id"]] = product
+    for product_id in rnd.sample(sorted(current), 25):
+        changed = {**current[product_id], "price": rnd.choice([1, 10.0, 50]), "name": "Новое имя"}
+        engine.upsert(changed, product_id)
+        current[product_id] = changed
+    # Удаляем больше половины, чтобы снимок сжался
+    for product_id in rnd.sample(sorted(current), 50):
+        engine.remove(product_id)
+        del current[product_id]
+
+    rebuilt = load_engine(list(current.values()))
+    fetch = lambda target: lambda cursor: target.query(None, None, None, sort_by, PAGE_SIZE, cursor, PAGE_SIZE)
+    assert walk(fetch(engine)) == walk(fetch(rebuilt))
+    assert len(engine) == len(current)
+
+
+def test_relevance_order_and_pages(products):
+    engine = load_engine(products)
+    rnd = random.Random(3)
+    matched = rnd.sample(products, 30)
+    scores = {product["id"]: rnd.choice([0.5, 1.0, 2.25]) for product in matched}
+    # Id, которых нет в снимке, отбрасываются
+    ids = np.array(list(scores) + ["unknown"])
+    matches = (ids, np.array(list(scores.values()) + [9.0]))
+
+    pages = walk(lambda cursor: engine.query(None, None, None, None, PAGE_SIZE, cursor, PAGE_SIZE, matches))
+    expected = sorted(scores, key=lambda product_id: (-scores[product_id], product_id))
+    assert [product_id for page in pages for product_id in page["products"]] == expected
+    assert engine.query(None, None, None, RELEVANCE_SORT, None, None, PAGE_SIZE, matches) == expected
+
+
+def test_missing_field_falls_back_to_mongo(products):
+    engine = load_engine(products + [{"id": "noname", "price": 1, "category": "a", "created_at": datetime(2025, 1, 1)}])
+    assert engine.query(None, None, None, "name", PAGE_SIZE, None, PAGE_SIZE) is None
+    assert engine.query(None, None, None, "price_low", PAGE_SIZE, None, PAGE_SIZE) is not None
+    # Курсор с пустым значением поля: такой порядок обслуживает только MongoDB
+    assert engine.query(None, None, None, "price_low", PAGE_SIZE, raw_cursor("price_low", [None, "x"]), PAGE_SIZE) is None
+
+
+@pytest.mark.parametrize("sort_by, keys", [
+    ("price_low", [{"$gt": ""}, "x"]),
+    ("price_low", ["10", "x"]),
+    ("newest", [{"$dt": 5}, "x"]),
+    ("name", [1, "x"]),
+    (None, [{"$ne": None}]),
+    (RELEVANCE_SORT, [True, "x"]),
+])
+def test_engine_and_mongo_reject_same_cursors(products, sort_by, keys):
+    engine = load_engine(products)
+    cursor = raw_cursor(sort_by, keys)
+    with pytest.raises(InvalidCursorError):
+        apply_cursor({}, cursor, sort_by)
+    matches = (np.array([products[0]["id"]]), np.array([1.0])) if sort_by == RELEVANCE_SORT else None
+    with pytest.raises(InvalidCursorError):
+        engine.query(None, None, None, sort_by, PAGE_SIZE, cursor, PAGE_SIZE, matches)
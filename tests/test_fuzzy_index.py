@@ -0,0 +1,73 @@
+import pytest
+
+from fuzzy_index import TrigramIndex, bounded_levenshtein, max_edit_distance, trigrams
+
+
+@pytest.mark.parametrize("a, b, max_distance, expected", [
+    ("телфон", "телефон", 1, 1),
+    ("kitten", "sitting", 3, 3),
+    ("kitten", "sitting", 2, None),
+    ("abc", "abc", 0, 0),
+    ("abc", "xyz", 2, None),
+    ("ab", "abcd", 1, None),
+    ("", "ab", 2, 2),
+])
+def test_bounded_levenshtein(a, b, max_distance, expected):
+    assert bounded_levenshtein(a, b, max_distance) == expected
+
+
+def test_trigrams_are_padded():
+    assert trigrams("чай") == {"  ч", " ча", "чай", "ай "}
+
+
+def test_max_edit_distance():
+    assert max_edit_distance("чехол") == 1
+    assert max_edit_distance("наушники") == 2
+
+
+def make_index():
+    index = TrigramIndex()
+    index.replace_all([
+        {"id": "p1", "name": "Samsung Galaxy S24"},
+        {"id": "p2", "name": "Чехол силиконовый"},
+        {"id": "p3", "name": "Наушники беспроводные"},
+        {"id": "p4", "name": "Кабель для наушников"},
+    ])
+    return index
+
+
+def test_correct_words():
+    index = make_index()
+    assert index.correct("samsng galaxi") == "samsung galaxy"
+    assert index.correct("Чехл силеконовый") == "чехол силиконовый"
+    # Известные слова и слова без близких соседей не меняются
+    assert index.correct("Наушники") is None
+    assert index.correct("zzzzzz") is None
+    assert index.correct("") is None
+
+
+def test_short_words_are_not_corrected():
+    index = make_index()
+    assert index.correct_word("s2") is None
+
+
+def test_nearest_then_most_frequent():
+    index = TrigramIndex()
+    index.replace_all([
+        {"id": "p1", "name": "кабель"},
+        {"id": "p2", "name": "кабели"},
+        {"id": "p3", "name": "кабели usb"},
+    ])
+    # Оба слова на расстоянии 1 - выбирается то, что встречается чаще
+    assert index.correct_word("кабеля") == "кабели"
+
+
+def test_upsert_and_remove():
+    index = make_index()
+    index.upsert({"id": "p1", "name": "Motorola Edge"})
+    assert index.correct("motorolla") == "motorola"
+    # Слова из прежнего названия больше не предлагаются
+    assert index.correct("samsng") is None
+    index.remove("p1")
+    assert index.correct("motorolla") is None
+    assert len(index) == 3
@@ -0,0 +1,65 @@
+import pytest
+
+from http_cache import RangeNotSatisfiableError, etag_matches, negotiate_media_type, parse_range
+
+AVAILABLE = ["image/avif", "image/webp"]
+
+
+@pytest.mark.parametrize("header, size, expected", [
+    (None, 100, None),
+    ("", 100, None),
+    ("bytes=0-9", 100, (0, 9)),
+    ("bytes=90-", 100, (90, 99)),
+    ("bytes=50-500", 100, (50, 99)),
+    ("bytes=-10", 100, (90, 99)),
+    ("bytes=-500", 100, (0, 99)),
+    (" bytes=1-1 ", 100, (1, 1)),
+    # Несколько диапазонов и чужие единицы - объект целиком
+    ("bytes=0-1,5-9", 100, None),
+    ("items=0-9", 100, None),
+    ("bytes=-", 100, None),
+])
+def test_parse_range(header, size, expected):
+    assert parse_range(header, size) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=100-", "bytes=10-5", "bytes=-0"])
+def test_parse_range_not_satisfiable(header):
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range(header, 100)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"x", "abc"', True),
+    ("*", True),
+    ('"abcd"', False),
+    ("abc", False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "image/jpeg"),
+    ("image/avif,image/webp,*/*", "image/avif"),
+    ("image/webp,*/*", "image/webp"),
+    ("image/avif;q=0.5,image/webp", "image/webp"),
+    ("image/avif;q=0.8,image/webp;q=0.8", "image/avif"),
+    # Подстановки выбирают тип по умолчанию
+    ("image/*", "image/jpeg"),
+    ("*/*", "image/jpeg"),
+    ("image/webp;q=0", "image/jpeg"),
+    ("image/webp;q=bad", "image/jpeg"),
+    ("IMAGE/WEBP", "image/webp"),
+    ("image/png", "image/jpeg"),
+])
+def test_negotiate_media_type(accept, expected):
+    assert negotiate_media_type(accept, AVAILABLE, "image/jpeg") == expected
+
+
+def test_negotiate_only_offers_available_types():
+    assert negotiate_media_type("image/avif", ["image/webp"], "image/jpeg") == "image/jpeg"
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from image_store import ImageStore, LocalImageStore, content_hash
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def read_range(store, key, start, end, chunk_size):
+    return b"".join([chunk async for chunk in store.iter_range(key, start, end, chunk_size)])
+
+
+def test_image_store_is_abstract():
+    with pytest.raises(TypeError):
+        ImageStore()
+
+    class Partial(ImageStore):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_local_store_is_content_addressed(tmp_path):
+    store = LocalImageStore(str(tmp_path))
+    data = b"image bytes" * 100
+    key = run(store.put(data))
+    assert key == content_hash(data)
+    assert run(store.put(data)) == key
+    assert run(store.get(key)) == data
+    assert run(store.size(key)) == len(data)
+    assert run(store.exists(key))
+
+    run(store.delete(key))
+    assert run(store.get(key)) is None
+    assert run(store.size(key)) is None
+    # Удаление отсутствующего объекта не ошибка
+    run(store.delete(key))
+
+
+def test_local_store_reads_ranges(tmp_path):
+    store = LocalImageStore(str(tmp_path))
+    data = bytes(range(256)) * 4
+    key = run(store.put(data))
+    assert run(read_range(store, key, 0, len(data) - 1, 100)) == data
+    assert run(read_range(store, key, 10, 19, 3)) == data[10:20]
+
+
+def test_put_at_keeps_objects_apart(tmp_path):
+    store = LocalImageStore(str(tmp_path))
+    data = b"same original"
+    run(store.put_at("job1-0", data))
+    run(store.put_at("job2-0", data))
+    run(store.delete("job1-0"))
+    assert run(store.get("job2-0")) == data
@@ -0,0 +1,51 @@
+import random
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from image_utils import MAX_BUDGET_ATTEMPTS, MIN_BUDGET_QUALITY, ImagePipeline
+
+
+@pytest.fixture(scope="module")
+def noisy_image():
+    # Шум плохо сжимается, поэтому размер заметно зависит от качества
+    rnd = random.Random(0)
+    image = Image.new("RGB", (96, 96))
+    image.putdata([(rnd.randrange(256), rnd.randrange(256), rnd.randrange(256)) for _ in range(96 * 96)])
+    return image
+
+
+def encoded_sizes(image, qualities):
+    return {quality: len(ImagePipeline.encode(image, quality=quality)) for quality in qualities}
+
+
+def test_within_budget_keeps_quality(noisy_image):
+    top = ImagePipeline.encode(noisy_image, quality=85)
+    assert ImagePipeline.encode_to_budget(noisy_image, None, quality=85) == top
+    assert ImagePipeline.encode_to_budget(noisy_image, len(top), quality=85) == top
+
+
+def test_bisects_to_best_fitting_quality(noisy_image):
+    sizes = encoded_sizes(noisy_image, range(MIN_BUDGET_QUALITY, 86))
+    budget = (sizes[MIN_BUDGET_QUALITY] + sizes[85]) // 2
+    result = ImagePipeline.encode_to_budget(noisy_image, budget, quality=85)
+    assert len(result) <= budget
+    fitting = [quality for quality, size in sizes.items() if size <= budget]
+    # Бисекция за MAX_BUDGET_ATTEMPTS кодирований находит качество рядом с лучшим
+    assert len(result) >= sizes[max(fitting) - 2]
+
+
+def test_unreachable_budget_returns_smallest(noisy_image, monkeypatch):
+    calls = []
+    encode = ImagePipeline.encode
+
+    def counting_encode(img, format="JPEG", quality=85):
+        calls.append(quality)
+        return encode(img, format=format, quality=quality)
+
+    monkeypatch.setattr(ImagePipeline, "encode", staticmethod(counting_encode))
+    result = ImagePipeline.encode_to_budget(noisy_image, 10, quality=85)
+    assert len(calls) <= MAX_BUDGET_ATTEMPTS
+    assert min(calls) == MIN_BUDGET_QUALITY
+    assert result == encode(noisy_image, quality=MIN_BUDGET_QUALITY)
@@ -0,0 +1,90 @@
+import base64
+import json
+from datetime import datetime
+
+import pytest
+
+from pagination import (
+    InvalidCursorError, RELEVANCE_SORT, apply_cursor, build_keyset_filter, decode_cursor, encode_cursor, get_sort_spec,
+    sort_mode
+)
+
+
+def raw_cursor(sort_by, keys):
+    raw = json.dumps({"s": sort_by, "k": keys}).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+DOCUMENT = {"id": "p1", "name": "Чехол", "price": 10.5, "created_at": datetime(2025, 1, 2, 3, 4, 5), "score": 1.25}
+
+
+@pytest.mark.parametrize("sort_by", [None, "price_low", "price_high", "name", "newest", "oldest", RELEVANCE_SORT])
+def test_cursor_round_trip(sort_by):
+    keys = decode_cursor(encode_cursor(sort_by, DOCUMENT), sort_by)
+    assert keys == [DOCUMENT[field] for field, _ in get_sort_spec(sort_by)]
+
+
+def test_unknown_sort_uses_id_cursor():
+    assert decode_cursor(encode_cursor("bogus", DOCUMENT), None) == ["p1"]
+
+
+def test_sort_mode_maps_unknown_to_default():
+    assert sort_mode("price_low") == "price_low"
+    assert sort_mode(RELEVANCE_SORT) == RELEVANCE_SORT
+    assert sort_mode("bogus") is None
+    assert sort_mode(None) is None
+
+
+def test_cursor_for_other_sort_rejected():
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(encode_cursor("name", DOCUMENT), "price_low")
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", raw_cursor("name", ["x"]), "e30"])
+def test_malformed_cursor_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor, "name")
+
+
+@pytest.mark.parametrize("sort_by, keys", [
+    ("name", [{"$regex": "(a+)+$"}, "x"]),
+    ("name", ["x", {"$gt": ""}]),
+    ("price_low", ["10", "x"]),
+    ("price_low", [True, "x"]),
+    ("price_low", [float("nan"), "x"]),
+    ("newest", ["2025-01-01", "x"]),
+    ("newest", [{"$dt": "2025-01-01T00:00:00", "$ne": 1}, "x"]),
+    ("newest", [{"$dt": "2025-01-01T00:00:00+03:00"}, "x"]),
+    (None, [None]),
+    (None, [["p1"]]),
+])
+def test_cursor_with_wrong_key_types_rejected(sort_by, keys):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(raw_cursor(sort_by, keys), sort_by)
+
+
+def test_missing_sort_value_allowed():
+    assert decode_cursor(raw_cursor("price_low", [None, "p1"]), "price_low") == [None, "p1"]
+
+
+def test_keyset_filter_ascending_and_descending():
+    assert build_keyset_filter("price_low", [10, "p1"]) == {"$or": [
+        {"price": {"$gt": 10}},
+        {"price": 10, "id": {"$gt": "p1"}},
+    ]}
+    assert build_keyset_filter("newest", [DOCUMENT["created_at"], "p1"]) == {"$or": [
+        {"created_at": {"$lt": DOCUMENT["created_at"]}},
+        {"created_at": DOCUMENT["created_at"], "id": {"$lt": "p1"}},
+    ]}
+    assert build_keyset_filter(RELEVANCE_SORT, [1.5, "p1"]) == {"$or": [
+        {"score": {"$lt": 1.5}},
+        {"score": 1.5, "id": {"$gt": "p1"}},
+    ]}
+    assert build_keyset_filter(None, ["p1"]) == {"id": {"$gt": "p1"}}
+
+
+def test_apply_cursor_keeps_existing_or():
+    query = {"status": "active", "$or": [{"name": "a"}, {"name": "b"}]}
+    apply_cursor(query, encode_cursor(None, DOCUMENT), None)
+    assert query["$or"] == [{"name": "a"}, {"name": "b"}]
+    assert query["$and"] == [{"id": {"$gt": "p1"}}]
@@ -0,0 +1,54 @@
+import random
+
+from perceptual_index import BKTree, find_duplicate_groups, hamming_distance
+
+
+def test_hamming_distance():
+    assert hamming_distance(0b1011, 0b1011) == 0
+    assert hamming_distance(0b1011, 0b0010) == 2
+    assert hamming_distance(0, (1 << 64) - 1) == 64
+
+
+def test_search_matches_brute_force():
+    rnd = random.Random(0)
+    base = rnd.getrandbits(64)
+    # Хеши вокруг одного центра, чтобы в радиусе поиска было что найти
+    items = [(base ^ rnd.getrandbits(64) & rnd.getrandbits(64) & rnd.getrandbits(64), f"k{i}") for i in range(300)]
+    tree = BKTree.from_items(items)
+    assert len(tree) == 300
+    for max_distance in (0, 4, 10):
+        for query, _ in items[:20]:
+            expected = sorted(
+                (hamming_distance(query, phash), key) for phash, key in items
+                if hamming_distance(query, phash) <= max_distance
+            )
+            assert tree.search(query, max_distance) == expected
+
+
+def test_same_hash_keeps_every_key():
+    tree = BKTree()
+    tree.add(0xFF, "a")
+    tree.add(0xFF, "b")
+    tree.add(0xFE, "c")
+    assert tree.search(0xFF, 0) == [(0, "a"), (0, "b")]
+    assert tree.search(0xFF, 1) == [(0, "a"), (0, "b"), (1, "c")]
+    assert len(tree) == 3
+
+
+def test_empty_tree():
+    assert BKTree().search(0, 64) == []
+
+
+def test_duplicate_groups_are_connected_components():
+    hashes = {
+        "a": 0b0000,
+        "b": 0b0001,
+        # c близко к b, но дальше от a - все равно одна группа
+        "c": 0b0011,
+        "d": 0b1111_0000_0000,
+        "e": 0b1111_0000_0001,
+        "lonely": (1 << 40) - 1,
+    }
+    groups = find_duplicate_groups(hashes, max_distance=1)
+    assert sorted(sorted(group) for group in groups) == [["a", "b", "c"], ["d", "e"]]
+    assert find_duplicate_groups(hashes, max_distance=0) == []
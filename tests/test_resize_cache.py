@@ -0,0 +1,72 @@
+import asyncio
+import os
+
+from resize_cache import DiskLRUCache
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_get_and_put(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    assert run(cache.get("a:10x10:JPEG")) is None
+    run(cache.put("a:10x10:JPEG", b"x" * 10))
+    assert run(cache.get("a:10x10:JPEG")) == b"x" * 10
+    assert cache.total_bytes == 10
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=30)
+    for key in ("a", "b", "c"):
+        run(cache.put(key, key.encode() * 10))
+    # "a" использовали недавно - вытесняется "b"
+    run(cache.get("a"))
+    run(cache.put("d", b"d" * 10))
+    assert run(cache.get("b")) is None
+    assert [run(cache.get(key)) is not None for key in ("a", "c", "d")] == [True, True, True]
+    assert cache.total_bytes == 30
+
+
+def test_oversized_value_is_not_cached(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=5)
+    run(cache.put("big", b"x" * 6))
+    assert run(cache.get("big")) is None
+    assert cache.total_bytes == 0
+
+
+def test_index_survives_restart(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    run(cache.put("a", b"a" * 10))
+    run(cache.put("b", b"b" * 20))
+    reopened = DiskLRUCache(str(tmp_path), max_bytes=100)
+    assert reopened.total_bytes == 30
+    assert run(reopened.get("b")) == b"b" * 20
+
+
+def test_file_removed_outside_is_a_miss(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=100)
+    run(cache.put("a", b"a" * 10))
+    name = cache._file_name("a")
+    os.remove(cache._path(name))
+    assert run(cache.get("a")) is None
+    assert cache.total_bytes == 0
+
+
+def test_get_or_create_renders_once(tmp_path):
+    async def scenario(root):
+        cache = DiskLRUCache(root, max_bytes=100)
+        calls = []
+
+        async def render():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return b"rendered"
+
+        results = await asyncio.gather(*(cache.get_or_create("key", render) for _ in range(4)))
+        results.append(await cache.get_or_create("key", render))
+        return calls, results
+
+    calls, results = run(scenario(str(tmp_path)))
+    assert len(calls) == 1
+    assert results == [b"rendered"] * 5
@@ -0,0 +1,79 @@
+import numpy as np
+
+from search_index import SearchIndex, split_words, stem, tokenize
+
+PRODUCTS = [
+    {"id": "p1", "name": "Чехол для телефона", "category": "Аксессуары", "description": "Силиконовый чехол"},
+    {"id": "p2", "name": "Телефон Samsung Galaxy", "category": "Смартфоны", "description": "Смартфон с чехлом в комплекте"},
+    {"id": "p3", "name": "Наушники", "category": "Аудио", "description": "Беспроводные, подходят к телефону"},
+]
+
+
+def ranked(index, text):
+    ids, scores = index.search(text)
+    order = np.lexsort((ids, -scores))
+    return ids[order].tolist()
+
+
+def make_index(products=PRODUCTS):
+    index = SearchIndex()
+    index.replace_all(products)
+    return index
+
+
+def test_split_words():
+    assert split_words("Ёлка, USB-C и 4K_видео!") == ["елка", "usb", "c", "и", "4k", "видео"]
+    assert split_words(None) == []
+
+
+def test_word_forms_share_stem():
+    assert stem("телефона") == stem("телефону") == stem("телефон")
+    assert stem("phones") == stem("phone")
+    # Числа и короткие слова не меняются
+    assert stem("2024") == "2024"
+    assert stem("usb") == "usb"
+    assert tokenize("Телефона") == [stem("телефона")]
+
+
+def test_name_matches_rank_above_description():
+    index = make_index()
+    # Слово в названии весит больше, чем в описании
+    assert ranked(index, "телефон")[2] == "p3"
+    assert ranked(index, "наушники")[0] == "p3"
+
+
+def test_unknown_words_find_nothing():
+    index = make_index()
+    ids, scores = index.search("холодильник")
+    assert len(ids) == 0 and len(scores) == 0
+    assert len(SearchIndex().search("телефон")[0]) == 0
+
+
+def test_upsert_replaces_document():
+    index = make_index()
+    index.upsert({"id": "p3", "name": "Колонка", "category": "Аудио", "description": ""})
+    assert "p3" not in ranked(index, "наушники")
+    assert ranked(index, "колонка") == ["p3"]
+    assert len(index) == 3
+
+
+def test_remove_and_compaction_match_fresh_index():
+    index = make_index()
+    extra = [
+        {"id": f"x{i}", "name": f"Кабель {i}", "category": "Аксессуары", "description": "для телефона"}
+        for i in range(10)
+    ]
+    for product in extra:
+        index.upsert(product)
+    # Удаляем больше половины строк - индекс сжимается
+    for product in extra[:8]:
+        index.remove(product["id"])
+    index.remove("unknown")
+    assert len(index) == 5
+    assert len(index._ids) < 2 * len(index)
+
+    fresh = make_index(PRODUCTS + extra[8:])
+    for text in ("телефон", "кабель", "аксессуары", "чехол"):
+        ids, scores = index.search(text)
+        fresh_ids, fresh_scores = fresh.search(text)
+        assert dict(zip(ids.tolist(), scores.tolist())) == dict(zip(fresh_ids.tolist(), fresh_scores.tolist()))
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight()
+        started = []
+
+        async def fetch():
+            started.append(1)
+            await asyncio.sleep(0.01)
+            return {"value": 42}
+
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        return flight, started, results
+
+    flight, started, results = run(scenario())
+    assert len(started) == 1
+    assert all(result is results[0] for result in results)
+    assert flight.stats() == {"calls": 5, "executions": 1, "collapsed": 4, "in_flight": 0}
+
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fetch(value):
+            await asyncio.sleep(0)
+            return value
+
+        results = await asyncio.gather(flight.do("a", lambda: fetch(1)), flight.do("b", lambda: fetch(2)))
+        return flight, results
+
+    flight, results = run(scenario())
+    assert results == [1, 2]
+    assert flight.executions == 2
+
+
+def test_result_is_not_cached():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return len(calls)
+
+        return [await flight.do("key", fetch), await flight.do("key", fetch)]
+
+    assert run(scenario()) == [1, 2]
+
+
+def test_exception_reaches_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+        return flight, results
+
+    flight, results = run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.executions == 1
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_call():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return await leader
+
+    assert run(scenario()) == "done"
+
+
+def test_cancelled_leader_does_not_fail_waiters():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leader = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        # Клиент первого запроса отключился - остальные все равно получают результат
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return calls, await waiter
+
+    calls, result = run(scenario())
+    assert result == "done"
+    assert len(calls) == 1
@@ -0,0 +1,98 @@
+from suggest_index import KEY_LENGTH, SuggestIndex, normalize_query, suggestion_keys
+
+PRODUCTS = [
+    {"id": "p1", "name": "Samsung Galaxy S24", "category": "Смартфоны"},
+    {"id": "p2", "name": "Samsung Galaxy A15", "category": "Смартфоны"},
+    {"id": "p3", "name": "Чехол для Samsung", "category": "Аксессуары"},
+]
+
+
+def texts(suggestions):
+    return [suggestion["text"] for suggestion in suggestions]
+
+
+def make_index(products=PRODUCTS):
+    index = SuggestIndex()
+    index.replace_products(products)
+    return index
+
+
+def test_normalize_query():
+    assert normalize_query("  Ёлка   ЗЕЛЁНАЯ") == "елка зеленая"
+    # Пробел в конце означает, что слово дописано
+    assert normalize_query("samsung ") == "samsung "
+    assert normalize_query("!!") == ""
+
+
+def test_suggestion_keys_start_at_first_words():
+    assert suggestion_keys("Чехол для Samsung Galaxy") == ["чехол для samsung galaxy", "для samsung galaxy", "samsung galaxy"]
+    assert all(len(key) <= KEY_LENGTH for key in suggestion_keys("очень " * 20))
+
+
+def test_lookup_by_prefix_of_any_leading_word():
+    index = make_index()
+    assert texts(index.lookup("sams", 10)) == ["Samsung Galaxy A15", "Samsung Galaxy S24", "Чехол для Samsung"]
+    assert texts(index.lookup("gal", 10)) == ["Samsung Galaxy A15", "Samsung Galaxy S24"]
+    assert index.lookup("samsung galaxy s", 10) == [{"text": "Samsung Galaxy S24", "type": "product", "id": "p1"}]
+    assert index.lookup("смарт", 10) == [{"text": "Смартфоны", "type": "category"}]
+    assert index.lookup(" ", 10) == []
+
+
+def test_queries_ranked_by_weight_and_deduplicated():
+    index = make_index()
+    index.replace_queries([("samsung galaxy", 5), ("Samsung  Galaxy S24", 9), ("samsung a", 2)])
+    # Запрос с тем же текстом, что у товара, показывается один раз
+    assert texts(index.lookup("samsung", 10)) == [
+        "Samsung Galaxy S24", "samsung galaxy", "samsung a", "Samsung Galaxy A15", "Чехол для Samsung"
+    ]
+    assert len(index.lookup("samsung", 2)) == 2
+
+
+def test_upsert_and_remove_product():
+    index = make_index()
+    index.upsert_product({"id": "p4", "name": "Samsung Buds", "category": "Аудио"})
+    assert "Samsung Buds" in texts(index.lookup("samsung b", 10))
+    assert texts(index.lookup("ауд", 10)) == ["Аудио"]
+
+    index.upsert_product({"id": "p4", "name": "Наушники Buds", "category": "Аудио"})
+    assert texts(index.lookup("samsung b", 10)) == []
+    assert texts(index.lookup("buds", 10)) == ["Наушники Buds"]
+
+    index.remove_product("p4")
+    assert index.lookup("buds", 10) == []
+    # Категория без товаров пропадает из подсказок
+    assert index.lookup("ауд", 10) == []
+    index.remove_product("unknown")
+    assert len(index) == 5
+
+
+def test_incremental_updates_match_rebuild():
+    index = make_index()
+    index.upsert_product({"id": "p4", "name": "Samsung Galaxy Tab", "category": "Планшеты"})
+    index.upsert_product({"id": "p2", "name": "Samsung Galaxy A25", "category": "Смартфоны"})
+    index.remove_product("p3")
+    rebuilt = make_index([
+        PRODUCTS[0],
+        {"id": "p2", "name": "Samsung Galaxy A25", "category": "Смартфоны"},
+        {"id": "p4", "name": "Samsung Galaxy Tab", "category": "Планшеты"},
+    ])
+    for prefix in ("s", "samsung galaxy", "gal", "пла", "чех", "tab"):
+        assert index.lookup(prefix, 10) == rebuilt.lookup(prefix, 10)
+
+
+def test_is_known_tracks_catalog_words():
+    index = make_index()
+    assert index.is_known("Samsung galaxy")
+    assert index.is_known("чехол смартфоны")
+    assert not index.is_known("samsung scam")
+    assert not index.is_known("")
+    index.remove_product("p3")
+    assert not index.is_known("чехол")
+
+
+def test_copy_queries():
+    index = make_index()
+    index.replace_queries([("samsung galaxy", 5)])
+    fresh = make_index()
+    fresh.copy_queries(index)
+    assert fresh.lookup("samsung", 1) == [{"text": "samsung galaxy", "type": "query"}]